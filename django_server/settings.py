@@ -1,6 +1,9 @@
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
+from kombu import Exchange, Queue
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -129,4 +132,41 @@ CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
-CELERY_TIMEZONE = TIME_ZONE
\ No newline at end of file
+
+# 安装了orjson时任务消息和结果使用orjson编解码，仍接受json消息以便消费升级前投递的任务
+if find_spec('orjson') is not None:
+    import orjson
+    from kombu.serialization import register
+
+    register(
+        'orjson',
+        lambda obj: orjson.dumps(obj).decode('utf-8'),
+        orjson.loads,
+        content_type='application/x-orjson',
+        content_encoding='utf-8',
+    )
+    CELERY_ACCEPT_CONTENT = ['orjson', 'json']
+    CELERY_TASK_SERIALIZER = 'orjson'
+    CELERY_RESULT_SERIALIZER = 'orjson'
+CELERY_TIMEZONE = TIME_ZONE
+
+# 中间件操作进入middleware_ops队列，升级等长耗时操作在投递时指定upgrades队列；
+# 状态查询结果丢失无影响，使用不落盘的transient队列
+CELERY_TASK_DEFAULT_QUEUE = 'celery'
+CELERY_TASK_QUEUES = (
+    Queue('celery'),
+    Queue('middleware_ops'),
+    Queue('upgrades'),
+    Queue('transient', Exchange('transient', delivery_mode=1), routing_key='transient', durable=False),
+)
+CELERY_TASK_ROUTES = {
+    'middleware_manager.tasks.process_middleware_operation': {'queue': 'middleware_ops'},
+    'middleware_manager.tasks.get_middleware_status_info': {'queue': 'transient'},
+}
+
+# 长短任务混合，每个进程空闲时才取下一条消息，任务完成后再确认，worker异常退出时消息重新投递，
+# 重新投递的中间件操作在执行者停止刷新租约后重新认领（见tasks.OPERATION_LEASE_TIMEOUT）；
+# 只处理短任务的worker可在启动时用 --prefetch-multiplier=4 调高预取
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
@@ -615,10 +615,10 @@ class RedisAdapter(MiddlewareAdapter):
             self.middleware.save()
             
             # 记录详细错误信息
-            from .error_handler import ErrorTracker
-            error_tracker = ErrorTracker()
+            from .error_handler import get_error_tracker
+            error_tracker = get_error_tracker()
             error_tracker.log_error(
-                middleware_id=self.middleware.id,
+                middleware_id=str(self.middleware.id),
                 operation="get_status",
                 error=e,
                 context={"host": self.middleware.host, "port": self.middleware.port}
@@ -718,10 +718,10 @@ class RedisAdapter(MiddlewareAdapter):
             logger.error(f"备份Redis中间件 {self.middleware.id} 数据失败: {str(e)}")
             
             # 记录详细错误信息
-            from .error_handler import ErrorTracker
-            error_tracker = ErrorTracker()
+            from .error_handler import get_error_tracker
+            error_tracker = get_error_tracker()
             error_tracker.log_error(
-                middleware_id=self.middleware.id,
+                middleware_id=str(self.middleware.id),
                 operation="backup",
                 error=e,
                 context={"backup_path": backup_path}
@@ -877,10 +877,10 @@ class RedisAdapter(MiddlewareAdapter):
             self.middleware.save()
             
             # 记录详细错误信息
-            from .error_handler import ErrorTracker
-            error_tracker = ErrorTracker()
+            from .error_handler import get_error_tracker
+            error_tracker = get_error_tracker()
             error_tracker.log_error(
-                middleware_id=self.middleware.id,
+                middleware_id=str(self.middleware.id),
                 operation="restore",
                 error=e,
                 context={"backup_path": backup_path, "snapshot_path": snapshot_path}
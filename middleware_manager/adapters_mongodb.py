@@ -2,13 +2,14 @@ import logging
 import time
 import subprocess
 import pymongo
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple, List
 from django.utils import timezone
 from django.conf import settings
 import os
 import shutil
-from datetime import datetime
+from pathlib import Path
 import json
+from urllib.parse import quote
 
 # 导入基础适配器类
 from .adapters import MiddlewareAdapter, retry
@@ -16,10 +17,70 @@ from .adapters import MiddlewareAdapter, retry
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# MongoDB备份归档文件名
+ARCHIVE_NAME = "dump.archive.gz"
+
+# serverStatus查询，排除状态解析用不到的大段输出
+_SERVER_STATUS_CMD = {
+    "serverStatus": 1,
+    "repl": 0,
+    "metrics": 0,
+    "locks": 0,
+    "wiredTiger": 0,
+    "tcmalloc": 0,
+    "opcounters": 0,
+    "opcountersRepl": 0,
+    "asserts": 0,
+    "network": 0,
+}
+
+# 外部命令路径缓存（命令名 -> 绝对路径，未安装时为None）
+_BIN_CACHE: Dict[str, Optional[str]] = {}
+
+
+def _resolve(bin_name: str) -> str:
+    """解析外部命令的绝对路径，命令未安装时立即失败而不再fork子进程"""
+    if bin_name in _BIN_CACHE:
+        path = _BIN_CACHE[bin_name]
+    else:
+        path = shutil.which(bin_name)
+        _BIN_CACHE[bin_name] = path
+    if not path:
+        raise FileNotFoundError(f"{bin_name} 未安装")
+    return path
+
+
+# apt软件包索引缓存文件及其有效期（秒）
+_APT_PKGCACHE = "/var/cache/apt/pkgcache.bin"
+_APT_CACHE_MAX_AGE = 3600
+
+
+def _apt_cache_fresh() -> bool:
+    """判断apt软件包索引是否在有效期内更新过，是则可跳过apt-get update"""
+    try:
+        return time.time() - os.path.getmtime(_APT_PKGCACHE) < _APT_CACHE_MAX_AGE
+    except OSError:
+        return False
+
 
 class MongoDBAdapter(MiddlewareAdapter):
     """MongoDB中间件适配器"""
     
+    def __init__(self, middleware):
+        super().__init__(middleware)
+        # 预先构建连接URI，备份/恢复时直接通过--uri传给mongodump/mongorestore
+        self._mongo_uri = self._build_mongo_uri(self.middleware.host, self.middleware.port)
+        self._container_mongo_uri = self._build_mongo_uri('localhost', 27017)
+    
+    def _build_mongo_uri(self, host: str, port: int) -> str:
+        """构建MongoDB连接URI，用户名和密码经过转义以支持特殊字符"""
+        user = self.config.get('user')
+        password = self.config.get('password')
+        if user and password:
+            auth_source = self.config.get('auth_source', 'admin')
+            return f"mongodb://{quote(user, safe='')}:{quote(password, safe='')}@{host}:{port}/?authSource={quote(auth_source, safe='')}"
+        return f"mongodb://{host}:{port}/"
+    
     @retry(max_attempts=3, delay=2, exceptions=(pymongo.errors.PyMongoError, ConnectionError))
     def _get_client(self):
         """获取MongoDB客户端连接"""
@@ -27,10 +88,16 @@ class MongoDBAdapter(MiddlewareAdapter):
             'host': self.middleware.host,
             'port': self.middleware.port,
             'maxPoolSize': self.config.get('max_pool_size', 5),
+            'minPoolSize': self.config.get('min_pool_size', 1),  # 保留空闲连接，避免稀疏流量下重复握手
+            'maxIdleTimeMS': self.config.get('max_idle_time_ms', 60000),
+            'waitQueueTimeoutMS': self.config.get('wait_queue_timeout_ms', 5000),
             'serverSelectionTimeoutMS': 5000,  # 5秒超时
-            'connectTimeoutMS': 5000
+            'connectTimeoutMS': 5000,
+            'retryWrites': True,
+            'compressors': self.config.get('compressors', 'zstd,snappy,zlib'),  # 未安装的压缩库会被驱动忽略
+            'appname': f"common_agent/{self.middleware.id}"
         }
-        
+
         # 添加认证信息
         if self.config.get('user') and self.config.get('password'):
             connection_params['username'] = self.config.get('user')
@@ -62,18 +129,18 @@ class MongoDBAdapter(MiddlewareAdapter):
             image = self.config.get('docker_image', 'mongo:latest')
             
             # 检查容器是否存在
-            check_cmd = ["docker", "ps", "-a", "-q", "-f", f"name={container_name}"]
+            check_cmd = [_resolve("docker"), "ps", "-a", "-q", "-f", f"name={container_name}"]
             result = subprocess.run(check_cmd, capture_output=True, text=True)
             
             if result.stdout.strip():
                 # 容器存在，启动它
-                start_cmd = ["docker", "start", container_name]
+                start_cmd = [_resolve("docker"), "start", container_name]
                 subprocess.run(start_cmd, check=True)
             else:
                 # 容器不存在，创建并启动
                 port_mapping = f"{self.middleware.port}:27017"
                 run_cmd = [
-                    "docker", "run", "-d",
+                    _resolve("docker"), "run", "-d",
                     "--name", container_name,
                     "-p", port_mapping
                 ]
@@ -105,7 +172,7 @@ class MongoDBAdapter(MiddlewareAdapter):
             # 非Docker方式，使用系统服务
             # 这里假设使用systemd管理MongoDB服务
             service_name = self.config.get('service_name', 'mongod')
-            subprocess.run(["systemctl", "start", service_name], check=True)
+            subprocess.run([_resolve("systemctl"), "start", service_name], check=True)
         
         # 等待服务启动
         max_retries = 10
@@ -145,11 +212,11 @@ class MongoDBAdapter(MiddlewareAdapter):
         # 检查是否使用Docker
         if self.config.get('use_docker', False):
             container_name = self.config.get('container_name', f"mongodb-{self.middleware.id}")
-            subprocess.run(["docker", "stop", container_name], check=True)
+            subprocess.run([_resolve("docker"), "stop", container_name], check=True)
         else:
             # 非Docker方式，使用系统服务
             service_name = self.config.get('service_name', 'mongod')
-            subprocess.run(["systemctl", "stop", service_name], check=True)
+            subprocess.run([_resolve("systemctl"), "stop", service_name], check=True)
         
         # 更新中间件状态
         self.middleware.status = 'stopped'
@@ -187,16 +254,16 @@ class MongoDBAdapter(MiddlewareAdapter):
                 image = f"mongo:{target_version}"
                 
                 # 停止并删除旧容器
-                subprocess.run(["docker", "stop", container_name], check=True)
-                subprocess.run(["docker", "rm", container_name], check=True)
+                subprocess.run([_resolve("docker"), "stop", container_name], check=True)
+                subprocess.run([_resolve("docker"), "rm", container_name], check=True)
                 
                 # 拉取新版本镜像
-                subprocess.run(["docker", "pull", image], check=True)
+                subprocess.run([_resolve("docker"), "pull", image], check=True)
                 
                 # 创建并启动新容器
                 port_mapping = f"{self.middleware.port}:27017"
                 run_cmd = [
-                    "docker", "run", "-d",
+                    _resolve("docker"), "run", "-d",
                     "--name", container_name,
                     "-p", port_mapping
                 ]
@@ -227,12 +294,17 @@ class MongoDBAdapter(MiddlewareAdapter):
             else:
                 # 非Docker方式，使用系统包管理器升级
                 # 这里假设使用apt作为包管理器
-                subprocess.run(["apt-get", "update"], check=True)
-                subprocess.run(["apt-get", "install", "-y", f"mongodb-org={target_version}*"], check=True)
+                apt_env = {**os.environ, "DEBIAN_FRONTEND": "noninteractive"}
+                if not _apt_cache_fresh():
+                    subprocess.run([_resolve("apt-get"), "update"], check=True, env=apt_env)
+                subprocess.run(
+                    [_resolve("apt-get"), "install", "-y", "--no-install-recommends", f"mongodb-org={target_version}*"],
+                    check=True, env=apt_env
+                )
                 
                 # 重启服务
                 service_name = self.config.get('service_name', 'mongod')
-                subprocess.run(["systemctl", "restart", service_name], check=True)
+                subprocess.run([_resolve("systemctl"), "restart", service_name], check=True)
             
             # 等待服务启动
             max_retries = 10
@@ -291,63 +363,117 @@ class MongoDBAdapter(MiddlewareAdapter):
         try:
             # 检查服务是否运行
             if self.middleware.status != 'running':
-                return {
-                    "status": self.middleware.status,
-                    "version": self.middleware.version,
-                    "uptime": 0,
-                    "connections": 0,
-                    "memory_usage": 0,
-                    "cpu_usage": 0
-                }
+                return self._build_stopped_response()
             
             # 获取MongoDB状态信息
-            status_info = self._execute_command({"serverStatus": 1})
+            status_info = self._execute_command(_SERVER_STATUS_CMD)
             if not status_info.get("success"):
                 raise Exception(f"无法获取MongoDB状态信息: {status_info.get('error')}")
             
-            # 解析状态信息
-            server_status = status_info.get("result", {})
-            
-            # 获取运行时间
-            uptime = server_status.get("uptime", 0)
-            
-            # 获取连接数
-            connections = server_status.get("connections", {}).get("current", 0)
-            
-            # 获取内存使用情况
-            memory_info = server_status.get("mem", {})
-            memory_usage = memory_info.get("resident", 0) / 1024  # 转换为MB
-            
-            # 获取CPU使用率
-            cpu_info = server_status.get("cpu", {})
-            cpu_usage = cpu_info.get("user", 0) + cpu_info.get("system", 0)
-            
-            # 构建状态响应
-            status_response = {
-                "status": self.middleware.status,
-                "version": self.middleware.version,
-                "uptime": uptime,
-                "connections": connections,
-                "memory_usage": memory_usage,
-                "cpu_usage": cpu_usage,
-                "last_checked": timezone.now()
-            }
-            
+            status_response = self._build_status_response(status_info.get("result", {}))
             logger.info(f"已获取MongoDB中间件 {self.middleware.id} 状态信息")
             return status_response
             
         except Exception as e:
             logger.error(f"获取MongoDB状态信息失败: {str(e)}")
-            return {
-                "status": "error",
-                "version": self.middleware.version,
-                "uptime": 0,
-                "connections": 0,
-                "memory_usage": 0,
-                "cpu_usage": 0,
-                "last_checked": timezone.now(),
-                "error": str(e)
-            }
+            return self._build_error_response(e)
+    
+    @classmethod
+    def get_status_bulk(cls, adapters: List['MongoDBAdapter']) -> List[Dict[str, Any]]:
+        """批量获取多个MongoDB中间件的状态信息
+        
+        部署在同一主机端口且使用相同认证信息的中间件共用一次serverStatus查询，
+        N次往返减少为分组数次。
+        
+        Args:
+            adapters: MongoDB适配器列表
+            
+        Returns:
+            与adapters顺序一致的状态信息列表
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(adapters)
+        
+        # 按 (host, port, 认证信息) 分组运行中的中间件，各组使用组内适配器自己的账号查询
+        groups: Dict[Tuple, List[int]] = {}
+        for index, adapter in enumerate(adapters):
+            if adapter.middleware.status != 'running':
+                results[index] = adapter._build_stopped_response()
+            else:
+                groups.setdefault(adapter._status_group_key(), []).append(index)
+        
+        # 每组只发起一次serverStatus查询，再分发给组内各适配器
+        for indexes in groups.values():
+            status_info = adapters[indexes[0]]._execute_command(_SERVER_STATUS_CMD)
+            for index in indexes:
+                adapter = adapters[index]
+                if status_info.get("success"):
+                    results[index] = adapter._build_status_response(status_info.get("result", {}))
+                else:
+                    error = Exception(f"无法获取MongoDB状态信息: {status_info.get('error')}")
+                    logger.error(f"获取MongoDB状态信息失败: {str(error)}")
+                    results[index] = adapter._build_error_response(error)
+        
+        logger.info(f"已批量获取 {len(adapters)} 个MongoDB中间件状态信息，共查询 {len(groups)} 次")
+        return results
+    
+    def _status_group_key(self) -> Tuple:
+        """批量获取状态时的分组键，与_get_client使用的连接目标和认证信息一致"""
+        user, password = self.config.get('user'), self.config.get('password')
+        if not (user and password):
+            user = password = auth_source = None
+        else:
+            auth_source = self.config.get('auth_source', 'admin')
+        return (self.middleware.host, self.middleware.port, user, password, auth_source)
+    
+    def _build_stopped_response(self) -> Dict[str, Any]:
+        """构建未运行状态的响应"""
+        return {
+            "status": self.middleware.status,
+            "version": self.middleware.version,
+            "uptime": 0,
+            "connections": 0,
+            "memory_usage": 0,
+            "cpu_usage": 0
+        }
+    
+    def _build_status_response(self, server_status: Dict[str, Any]) -> Dict[str, Any]:
+        """根据serverStatus结果构建状态响应"""
+        # 获取运行时间
+        uptime = server_status.get("uptime", 0)
+        
+        # 获取连接数
+        connections = server_status.get("connections", {}).get("current", 0)
+        
+        # 获取内存使用情况
+        memory_info = server_status.get("mem", {})
+        memory_usage = memory_info.get("resident", 0) / 1024  # 转换为MB
+        
+        # 获取CPU使用率
+        cpu_info = server_status.get("cpu", {})
+        cpu_usage = cpu_info.get("user", 0) + cpu_info.get("system", 0)
+        
+        return {
+            "status": self.middleware.status,
+            "version": self.middleware.version,
+            "uptime": uptime,
+            "connections": connections,
+            "memory_usage": memory_usage,
+            "cpu_usage": cpu_usage,
+            "last_checked": timezone.now()
+        }
+    
+    def _build_error_response(self, error: Exception) -> Dict[str, Any]:
+        """构建获取状态失败时的响应"""
+        return {
+            "status": "error",
+            "version": self.middleware.version,
+            "uptime": 0,
+            "connections": 0,
+            "memory_usage": 0,
+            "cpu_usage": 0,
+            "last_checked": timezone.now(),
+            "error": str(error)
+        }
     
     @retry(max_attempts=3, delay=2, exceptions=(pymongo.errors.PyMongoError, ConnectionError, Exception))
     def backup(self, backup_path: Optional[str] = None) -> Dict[str, Any]:
@@ -357,79 +483,48 @@ class MongoDBAdapter(MiddlewareAdapter):
         # 如果未指定备份路径，则使用默认路径
         if not backup_path:
             backup_dir = self.config.get('backup_dir', '/tmp/mongodb_backups')
-            os.makedirs(backup_dir, exist_ok=True)
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+            timestamp = time.strftime('%Y%m%d%H%M%S')
             backup_path = os.path.join(backup_dir, f"mongodb_{self.middleware.id}_{timestamp}")
-            os.makedirs(backup_path, exist_ok=True)
+            Path(backup_path).mkdir(parents=True, exist_ok=True)
+        
+        # 备份以gzip压缩的归档文件形式保存在备份目录中
+        archive_path = os.path.join(backup_path, ARCHIVE_NAME)
         
         try:
             # 检查是否使用Docker
             if self.config.get('use_docker', False):
                 container_name = self.config.get('container_name', f"mongodb-{self.middleware.id}")
                 
-                # 使用Docker执行备份
+                # 在容器内执行mongodump，归档直接从标准输出写入主机文件，无需docker cp
                 backup_cmd = [
-                    "docker", "exec", container_name,
-                    "mongodump"
+                    _resolve("docker"), "exec", container_name,
+                    "mongodump", "--uri", self._container_mongo_uri, "--archive", "--gzip"
                 ]
                 
-                # 添加认证信息
-                if self.config.get('user') and self.config.get('password'):
-                    backup_cmd.extend([
-                        "--username", self.config.get('user'),
-                        "--password", self.config.get('password'),
-                        "--authenticationDatabase", self.config.get('auth_source', 'admin')
-                    ])
-                
                 # 添加数据库名称
                 if self.config.get('database'):
                     backup_cmd.extend(["--db", self.config.get('database')])
                 
-                # 添加输出目录
-                temp_dir = "/tmp/mongodb_backup"
-                backup_cmd.extend(["--out", temp_dir])
-                
                 # 执行备份命令
-                subprocess.run(backup_cmd, check=True)
-                
-                # 将备份从容器复制到主机
-                copy_cmd = ["docker", "cp", f"{container_name}:{temp_dir}/.", backup_path]
-                subprocess.run(copy_cmd, check=True)
-                
-                # 清理容器中的临时备份
-                cleanup_cmd = ["docker", "exec", container_name, "rm", "-rf", temp_dir]
-                subprocess.run(cleanup_cmd, check=True)
+                with open(archive_path, 'wb') as archive_file:
+                    subprocess.run(backup_cmd, stdout=archive_file, check=True)
             else:
                 # 非Docker方式，直接使用mongodump
-                backup_cmd = ["mongodump"]
-                
-                # 添加连接信息
-                backup_cmd.extend([
-                    "--host", self.middleware.host,
-                    "--port", str(self.middleware.port)
-                ])
-                
-                # 添加认证信息
-                if self.config.get('user') and self.config.get('password'):
-                    backup_cmd.extend([
-                        "--username", self.config.get('user'),
-                        "--password", self.config.get('password'),
-                        "--authenticationDatabase", self.config.get('auth_source', 'admin')
-                    ])
+                backup_cmd = [
+                    _resolve("mongodump"), "--uri", self._mongo_uri,
+                    f"--archive={archive_path}", "--gzip"
+                ]
                 
                 # 添加数据库名称
                 if self.config.get('database'):
                     backup_cmd.extend(["--db", self.config.get('database')])
                 
-                # 添加输出目录
-                backup_cmd.extend(["--out", backup_path])
-                
                 # 执行备份命令
                 subprocess.run(backup_cmd, check=True)
             
             # 检查备份是否成功
-            if not os.path.exists(backup_path) or not os.listdir(backup_path):
-                raise Exception(f"备份目录 {backup_path} 创建失败或为空")
+            if not os.path.exists(archive_path) or os.path.getsize(archive_path) == 0:
+                raise Exception(f"备份文件 {archive_path} 创建失败或为空")
             
             logger.info(f"MongoDB中间件 {self.middleware.id} 已成功备份到 {backup_path}")
             return {"success": True, "backup_path": backup_path}
@@ -453,71 +548,51 @@ class MongoDBAdapter(MiddlewareAdapter):
         if not os.path.exists(backup_path) or not os.path.isdir(backup_path):
             raise FileNotFoundError(f"备份目录 {backup_path} 不存在或不是目录")
         
+        archive_path = os.path.join(backup_path, ARCHIVE_NAME)
+        use_archive = os.path.isfile(archive_path)
+        
         try:
             # 检查是否使用Docker
             if self.config.get('use_docker', False):
                 container_name = self.config.get('container_name', f"mongodb-{self.middleware.id}")
-                
-                # 创建容器内的临时目录
-                temp_dir = "/tmp/mongodb_restore"
-                mkdir_cmd = ["docker", "exec", container_name, "mkdir", "-p", temp_dir]
-                subprocess.run(mkdir_cmd, check=True)
-                
-                # 将备份复制到容器
-                copy_cmd = ["docker", "cp", f"{backup_path}/.", f"{container_name}:{temp_dir}"]
-                subprocess.run(copy_cmd, check=True)
-                
-                # 使用Docker执行恢复
                 restore_cmd = [
-                    "docker", "exec", container_name,
-                    "mongorestore"
+                    _resolve("docker"), "exec", "-i", container_name,
+                    "mongorestore", "--uri", self._container_mongo_uri
                 ]
                 
-                # 添加认证信息
-                if self.config.get('user') and self.config.get('password'):
-                    restore_cmd.extend([
-                        "--username", self.config.get('user'),
-                        "--password", self.config.get('password'),
-                        "--authenticationDatabase", self.config.get('auth_source', 'admin')
-                    ])
-                
-                # 添加数据库名称
-                if self.config.get('database'):
-                    restore_cmd.extend(["--db", self.config.get('database')])
-                
-                # 添加输入目录
-                restore_cmd.append(temp_dir)
-                
-                # 执行恢复命令
-                subprocess.run(restore_cmd, check=True)
-                
-                # 清理容器中的临时目录
-                cleanup_cmd = ["docker", "exec", container_name, "rm", "-rf", temp_dir]
-                subprocess.run(cleanup_cmd, check=True)
+                if use_archive:
+                    # 归档通过标准输入传入容器，无需docker cp
+                    restore_cmd.extend(["--archive", "--gzip"])
+                    if self.config.get('database'):
+                        restore_cmd.extend(["--nsInclude", f"{self.config.get('database')}.*"])
+                    with open(archive_path, 'rb') as archive_file:
+                        subprocess.run(restore_cmd, stdin=archive_file, check=True)
+                else:
+                    # 兼容旧的目录格式备份，需要先复制到容器内
+                    temp_dir = "/tmp/mongodb_restore"
+                    subprocess.run([_resolve("docker"), "exec", container_name, "mkdir", "-p", temp_dir], check=True)
+                    subprocess.run([_resolve("docker"), "cp", f"{backup_path}/.", f"{container_name}:{temp_dir}"], check=True)
+                    
+                    if self.config.get('database'):
+                        restore_cmd.extend(["--db", self.config.get('database')])
+                    restore_cmd.append(temp_dir)
+                    subprocess.run(restore_cmd, check=True)
+                    
+                    # 清理容器中的临时目录
+                    subprocess.run([_resolve("docker"), "exec", container_name, "rm", "-rf", temp_dir], check=True)
             else:
                 # 非Docker方式，直接使用mongorestore
-                restore_cmd = ["mongorestore"]
-                
-                # 添加连接信息
-                restore_cmd.extend([
-                    "--host", self.middleware.host,
-                    "--port", str(self.middleware.port)
-                ])
-                
-                # 添加认证信息
-                if self.config.get('user') and self.config.get('password'):
-                    restore_cmd.extend([
-                        "--username", self.config.get('user'),
-                        "--password", self.config.get('password'),
-                        "--authenticationDatabase", self.config.get('auth_source', 'admin')
-                    ])
-                
-                # 添加数据库名称
-                if self.config.get('database'):
-                    restore_cmd.extend(["--db", self.config.get('database')])
-                
-                # 添加输入目录
-                restore_cmd.append(backup_path)
+                restore_cmd = [_resolve("mongorestore"), "--uri", self._mongo_uri]
+                
+                if use_archive:
+                    restore_cmd.extend([f"--archive={archive_path}", "--gzip"])
+                    if self.config.get('database'):
+                        restore_cmd.extend(["--nsInclude", f"{self.config.get('database')}.*"])
+                else:
+                    # 兼容旧的目录格式备份
+                    if self.config.get('database'):
+                        restore_cmd.extend(["--db", self.config.get('database')])
+                    restore_cmd.append(backup_path)
                 
                 # 执行恢复命令
                 subprocess.run(restore_cmd, check=True)
@@ -589,6 +664,8 @@ class MongoDBAdapter(MiddlewareAdapter):
         try:
             # 更新配置
             self.config.update(new_config)
+            self._mongo_uri = self._build_mongo_uri(self.middleware.host, self.middleware.port)
+            self._container_mongo_uri = self._build_mongo_uri('localhost', 27017)
             
             # 检查是否使用Docker
             if self.config.get('use_docker', False):
@@ -601,7 +678,7 @@ class MongoDBAdapter(MiddlewareAdapter):
                 if 'max_connections' in new_config:
                     max_connections = new_config.get('max_connections')
                     set_cmd = [
-                        "docker", "exec", container_name,
+                        _resolve("docker"), "exec", container_name,
                         "mongo", "--eval",
                         f"db.adminCommand({{setParameter: 1, maxConnections: {max_connections}}})"
                     ]
@@ -623,7 +700,7 @@ class MongoDBAdapter(MiddlewareAdapter):
                 if 'max_connections' in new_config:
                     max_connections = new_config.get('max_connections')
                     set_cmd = [
-                        "mongo",
+                        _resolve("mongo"),
                         "--host", self.middleware.host,
                         "--port", str(self.middleware.port),
                         "--eval", f"db.adminCommand({{setParameter: 1, maxConnections: {max_connections}}})"
@@ -656,6 +733,8 @@ class MongoDBAdapter(MiddlewareAdapter):
             
             # 恢复旧配置
             self.config = old_config
+            self._mongo_uri = self._build_mongo_uri(self.middleware.host, self.middleware.port)
+            self._container_mongo_uri = self._build_mongo_uri('localhost', 27017)
             
             # 更新中间件状态为错误
             self.middleware.status = 'error'
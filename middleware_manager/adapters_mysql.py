@@ -1,8 +1,17 @@
+import hashlib
 import logging
 import time
 import subprocess
 import pymysql
-from typing import Dict, Any, Optional, Tuple
+import queue
+import threading
+import socket
+import select
+import errno
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple, List
 from django.utils import timezone
 from django.conf import settings
 import os
@@ -15,49 +24,376 @@ from .adapters import MiddlewareAdapter, retry
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 连接池默认空闲连接数上下限
+DEFAULT_MIN_IDLE = 2
+DEFAULT_MAX_IDLE = 10
+
+# 可在运行时通过SET GLOBAL热更新的配置项
+HOT_UPDATABLE_VARIABLES = ('max_connections', 'wait_timeout')
+
+# 压缩备份文件后缀及压缩命令（输出文件路径追加在末尾）
+ZSTD_SUFFIX = ".zst"
+ZSTD_COMPRESS_CMD = ["zstd", "-T0", "-3", "-q", "-f", "-o"]
+
+# 等待服务启动的默认超时时间（秒）
+DEFAULT_STARTUP_TIMEOUT = 30
+
+
+def _wait_for_port_ready(host: str, port: int, deadline: float) -> bool:
+    """以非阻塞connect + select等待端口可连接，不会超过deadline（time.monotonic()）"""
+    try:
+        addr_info = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        return False
+    family, socktype, proto, _, address = addr_info[0]
+    
+    sock = socket.socket(family, socktype, proto)
+    try:
+        sock.setblocking(False)
+        err = sock.connect_ex(address)
+        if err == 0:
+            return True
+        if err not in (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY):
+            return False
+        
+        # 以不超过100ms的粒度等待套接字可写，即连接建立完成
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _, writable, _ = select.select([], [sock], [], min(0.1, remaining))
+            if writable:
+                return sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0
+    finally:
+        sock.close()
+
+
+# mysqldump全量备份参数
+MYSQLDUMP_ARGS = ("--all-databases", "--single-transaction", "--quick", "--lock-tables=false")
+
+
+@lru_cache(maxsize=128)
+def _client_argv(program: str, host: str, port: int, user: str,
+                 use_docker: bool, container_name: str) -> Tuple[str, ...]:
+    """构建mysql/mysqldump客户端命令行（不含密码，密码经MYSQL_PWD环境变量传入）"""
+    if use_docker:
+        # -e MYSQL_PWD 将宿主进程环境中的变量透传进容器
+        interactive = ("-i",) if program == "mysql" else ()
+        return ("docker", "exec", *interactive, "-e", "MYSQL_PWD", container_name,
+                program, "-u", user)
+    return (program, "-h", host, "-P", str(port), "-u", user)
+
+
+def _cursor_class(as_dict: bool):
+    """查询使用的游标类型，默认元组游标避免逐行构造字典"""
+    return pymysql.cursors.DictCursor if as_dict else pymysql.cursors.Cursor
+
+
+def run_pipeline(producer: List[str], consumer: List[str],
+                 env: Optional[Dict[str, str]] = None) -> None:
+    """以管道连接两个外部命令（producer | consumer），任一失败时抛出CalledProcessError"""
+    first = subprocess.Popen(producer, stdout=subprocess.PIPE, env=env)
+    try:
+        second = subprocess.Popen(consumer, stdin=first.stdout, env=env)
+    except Exception:
+        first.kill()
+        first.wait()
+        raise
+    # 关闭父进程持有的管道读端，consumer提前退出时producer能收到SIGPIPE
+    first.stdout.close()
+    second.wait()
+    first.wait()
+    
+    if first.returncode != 0:
+        raise subprocess.CalledProcessError(first.returncode, producer)
+    if second.returncode != 0:
+        raise subprocess.CalledProcessError(second.returncode, consumer)
+
+
+async def _run_async(cmd: List[str]) -> None:
+    """异步执行外部命令，失败时抛出CalledProcessError"""
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+
+
+async def _run_sequence(commands: List[List[str]]) -> None:
+    """按顺序异步执行一组命令"""
+    for cmd in commands:
+        await _run_async(cmd)
+
+
+def run_concurrently(*sequences: List[List[str]]) -> None:
+    """并发执行多组命令，每组内部按顺序执行
+    
+    某一组失败不会中断其他组，全部结束后再抛出第一个失败组的异常。
+    
+    Args:
+        sequences: 命令组，每组为依次执行的命令列表
+    """
+    async def _gather():
+        return await asyncio.gather(*(_run_sequence(commands) for commands in sequences), return_exceptions=True)
+    
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        results = asyncio.run(_gather())
+    else:
+        # 当前线程已有运行中的事件循环时，在独立线程中运行
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            results = executor.submit(asyncio.run, _gather()).result()
+    
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+# get_status所需的状态变量，合并为一次查询
+STATUS_VARIABLES = ('Uptime', 'Threads_connected', 'Innodb_buffer_pool_bytes_data')
+STATUS_QUERY = "SHOW GLOBAL STATUS WHERE Variable_name IN ({})".format(
+    ", ".join(f"'{name}'" for name in STATUS_VARIABLES)
+)
+
+# 批量获取状态时的最大并发线程数
+BULK_STATUS_MAX_WORKERS = 32
+
+# 进程内共享的连接池：(host, port, user, 密码摘要, database, charset) -> 空闲连接队列
+_POOLS: Dict[Tuple, queue.Queue] = {}
+_POOLS_LOCK = threading.Lock()
+
+# 已发起过预建的连接池键，每个连接池在进程内只预建一次
+_PREFILLED: set = set()
+
+
+class PooledConnection:
+    """连接池中的连接包装，close()时将连接归还连接池而不是断开"""
+    
+    def __init__(self, connection, pool: queue.Queue):
+        self._connection = connection
+        self._pool = pool
+    
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None and isinstance(exc_val, (pymysql.OperationalError, pymysql.InterfaceError)):
+            # 连接级错误，丢弃该连接
+            self.discard()
+        else:
+            self.close()
+    
+    def close(self) -> None:
+        """归还连接到连接池，连接池已满时真正关闭连接"""
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        try:
+            # 结束未提交的事务，下一个使用者不会沿用旧的事务快照
+            connection.rollback()
+        except Exception:
+            try:
+                connection.close()
+            except Exception:
+                pass
+            return
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+    
+    def discard(self) -> None:
+        """关闭连接且不归还连接池"""
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
 
 class MySQLAdapter(MiddlewareAdapter):
     """MySQL中间件适配器"""
     
-    @retry(max_attempts=3, delay=2, exceptions=(pymysql.Error, ConnectionError))
-    def _get_connection(self):
-        """获取MySQL数据库连接"""
+    def __init__(self, middleware):
+        super().__init__(middleware)
+        self._load_cached_config()
+        # 缓存的服务端版本，服务重启前不会变化
+        self._cached_version: Optional[str] = None
+        
+        # 运行中的实例在后台线程中预热连接池，不阻塞适配器创建
+        if self.config.get('prefill', True) and self.middleware.status == 'running':
+            self._start_prefill()
+    
+    def _load_cached_config(self) -> None:
+        """解析各操作频繁使用的配置项，配置变更后需重新调用"""
+        self._use_docker = bool(self.config.get('use_docker', False))
+        self._container_name = self.config.get('container_name') or f"mysql-{self.middleware.id}"
+        self._service_name = self.config.get('service_name', 'mysql')
+        self._user = self.config.get('user')
+        self._password = self.config.get('password')
+    
+    def _client_argv(self, program: str) -> Tuple[str, ...]:
+        """当前配置下的mysql/mysqldump客户端命令行"""
+        return _client_argv(program, self.middleware.host, int(self.middleware.port),
+                            self._user, self._use_docker, self._container_name)
+    
+    def _client_env(self) -> Dict[str, str]:
+        """客户端子进程环境变量，密码经MYSQL_PWD传入以免出现在进程参数中"""
+        return {**os.environ, "MYSQL_PWD": self._password or ""}
+    
+    def _pool_key(self) -> Tuple:
+        """连接池键，相同目标和账号的适配器共享同一个连接池
+        
+        键中包含密码摘要，密码不同的适配器不会取到其他适配器已认证的连接。
+        """
+        return (
+            self.middleware.host,
+            self.middleware.port,
+            self._user,
+            hashlib.sha256((self._password or "").encode('utf-8')).hexdigest(),
+            self.config.get('database', ''),
+            self.config.get('charset', 'utf8mb4')
+        )
+    
+    def _connect(self):
+        """建立一条新的MySQL连接"""
         return pymysql.connect(
             host=self.middleware.host,
             port=self.middleware.port,
-            user=self.config.get('user'),
-            password=self.config.get('password'),
+            user=self._user,
+            password=self._password,
             database=self.config.get('database', ''),
             charset=self.config.get('charset', 'utf8mb4'),
             connect_timeout=self.config.get('connection_timeout', 10),
-            cursorclass=pymysql.cursors.DictCursor
+            cursorclass=pymysql.cursors.Cursor
         )
     
-    def _execute_query(self, query: str, params=None) -> Dict[str, Any]:
-        """执行MySQL查询"""
+    def _get_pool(self) -> queue.Queue:
+        """获取（必要时创建）当前适配器对应的连接池"""
+        key = self._pool_key()
+        with _POOLS_LOCK:
+            pool = _POOLS.get(key)
+            if pool is None:
+                pool = queue.Queue(maxsize=self.config.get('max_idle', DEFAULT_MAX_IDLE))
+                _POOLS[key] = pool
+        return pool
+    
+    def _start_prefill(self) -> None:
+        """在后台守护线程中预建连接，每个连接池只预建一次，之后的连接按需建立"""
+        key = self._pool_key()
+        with _POOLS_LOCK:
+            if key in _PREFILLED:
+                return
+            _PREFILLED.add(key)
+        threading.Thread(target=self._prefill_pool, name="mysql-prefill", daemon=True).start()
+    
+    def _prefill_pool(self) -> None:
+        """并发预建min_idle个空闲连接，避免首批请求同时握手；部分连接失败只记录日志"""
+        pool = self._get_pool()
+        count = self.config.get('min_idle', DEFAULT_MIN_IDLE) - pool.qsize()
+        if count <= 0:
+            return
+        
+        def _connect_into_pool():
+            try:
+                connection = self._connect()
+            except Exception as e:
+                logger.warning(f"预建MySQL连接失败: {str(e)}")
+                return
+            try:
+                pool.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+        
+        # 每条连接受connect_timeout限制，线程池在全部连接结束后才退出
+        with ThreadPoolExecutor(max_workers=count, thread_name_prefix="mysql-prefill") as executor:
+            for _ in range(count):
+                executor.submit(_connect_into_pool)
+    
+    @retry(max_attempts=3, delay=2, exceptions=(pymysql.Error, ConnectionError))
+    def _get_connection(self) -> 'PooledConnection':
+        """从连接池获取MySQL数据库连接，close()时归还连接池"""
+        pool = self._get_pool()
         try:
-            connection = self._get_connection()
-            with connection.cursor() as cursor:
-                cursor.execute(query, params or ())
-                if query.strip().upper().startswith('SELECT'):
-                    result = cursor.fetchall()
-                else:
-                    connection.commit()
-                    result = {"affected_rows": cursor.rowcount}
-            connection.close()
+            connection = pool.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        else:
+            # 空闲连接可能已被服务端断开，取出时检查并自动重连
+            connection.ping(reconnect=True)
+        return PooledConnection(connection, pool)
+    
+    def _execute_query(self, query: str, params=None, as_dict: bool = False) -> Dict[str, Any]:
+        """执行MySQL查询
+        
+        结果行默认为元组，as_dict为True时以字典返回（按列名取值）
+        """
+        try:
+            with self._get_connection() as connection:
+                with connection.cursor(_cursor_class(as_dict)) as cursor:
+                    cursor.execute(query, params or ())
+                    if cursor.description is not None:
+                        # SELECT/SHOW等返回结果集的语句
+                        result = cursor.fetchall()
+                    else:
+                        connection.commit()
+                        result = {"affected_rows": cursor.rowcount}
             return {"success": True, "result": result}
         except Exception as e:
             logger.error(f"MySQL查询执行失败: {str(e)}")
             return {"success": False, "error": str(e)}
     
+    def _wait_until_ready(self) -> None:
+        """等待MySQL服务可用
+        
+        先以非阻塞方式探测端口，端口可连接后建立一条探测连接，
+        之后只通过COM_PING确认服务可用，不再每次重新握手认证。
+        重试间隔从50ms指数增长到1s，超过startup_timeout仍未就绪则抛出异常。
+        """
+        deadline = time.monotonic() + self.config.get('startup_timeout', DEFAULT_STARTUP_TIMEOUT)
+        interval = 0.05
+        attempt = 0
+        connection = None
+        while True:
+            attempt += 1
+            try:
+                if connection is None:
+                    if not _wait_for_port_ready(self.middleware.host, self.middleware.port, deadline):
+                        raise TimeoutError(f"端口 {self.middleware.host}:{self.middleware.port} 未就绪")
+                    connection = self._connect()
+                connection.ping(reconnect=False)
+                # 探测成功的连接直接放入连接池供后续使用
+                PooledConnection(connection, self._get_pool()).close()
+                return
+            except Exception as e:
+                error = e
+                # 探测连接已断开时，下次重新建立
+                if connection is not None and not connection.open:
+                    connection = None
+            
+            if time.monotonic() >= deadline:
+                logger.error(f"MySQL服务启动失败: {str(error)}")
+                if connection is not None:
+                    connection.close()
+                raise error
+            logger.warning(f"等待MySQL服务启动 (第{attempt}次): {str(error)}")
+            time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+            interval = min(interval * 2, 1.0)
+    
     @retry(max_attempts=3, delay=2, exceptions=(pymysql.Error, ConnectionError, Exception))
     def start(self) -> Dict[str, Any]:
         """启动MySQL服务"""
         logger.info(f"正在启动MySQL中间件: {self.middleware.id}")
         
         # 检查是否使用Docker
-        if self.config.get('use_docker', False):
-            container_name = self.config.get('container_name', f"mysql-{self.middleware.id}")
+        if self._use_docker:
+            container_name = self._container_name
             image = self.config.get('docker_image', 'mysql:latest')
             
             # 检查容器是否存在
@@ -75,7 +411,7 @@ class MySQLAdapter(MiddlewareAdapter):
                     "docker", "run", "-d",
                     "--name", container_name,
                     "-p", port_mapping,
-                    "-e", f"MYSQL_ROOT_PASSWORD={self.config.get('password')}"
+                    "-e", f"MYSQL_ROOT_PASSWORD={self._password}"
                 ]
                 
                 # 添加数据库名称
@@ -97,29 +433,18 @@ class MySQLAdapter(MiddlewareAdapter):
         else:
             # 非Docker方式，使用系统服务
             # 这里假设使用systemd管理MySQL服务
-            service_name = self.config.get('service_name', 'mysql')
+            service_name = self._service_name
             subprocess.run(["systemctl", "start", service_name], check=True)
         
         # 等待服务启动
-        max_retries = 10
-        retry_interval = 3
-        for i in range(max_retries):
-            try:
-                # 尝试连接数据库
-                connection = self._get_connection()
-                connection.close()
-                break
-            except Exception as e:
-                if i == max_retries - 1:
-                    logger.error(f"MySQL服务启动失败: {str(e)}")
-                    raise
-                logger.warning(f"等待MySQL服务启动 ({i+1}/{max_retries}): {str(e)}")
-                time.sleep(retry_interval)
+        self._wait_until_ready()
         
-        # 验证服务是否成功启动
-        status_info = self._execute_query("SELECT VERSION() as version")
-        if not status_info.get("success"):
-            raise Exception(f"无法获取MySQL版本信息: {status_info.get('error')}")
+        # 验证服务是否成功启动，运行中实例的版本不会变化，只在未缓存时查询
+        if self._cached_version is None:
+            status_info = self._execute_query("SELECT VERSION()")
+            if not status_info.get("success"):
+                raise Exception(f"无法获取MySQL版本信息: {status_info.get('error')}")
+            self._cached_version = status_info["result"][0][0]
         
         # 更新中间件状态
         self.middleware.status = 'running'
@@ -127,7 +452,7 @@ class MySQLAdapter(MiddlewareAdapter):
         self.middleware.save()
         
         logger.info(f"MySQL中间件 {self.middleware.id} 已成功启动")
-        return {"success": True, "info": status_info.get("result")}
+        return {"success": True, "info": [{"version": self._cached_version}]}
     
     @retry(max_attempts=3, delay=2, exceptions=(pymysql.Error, ConnectionError, Exception))
     def stop(self) -> Dict[str, Any]:
@@ -135,12 +460,12 @@ class MySQLAdapter(MiddlewareAdapter):
         logger.info(f"正在停止MySQL中间件: {self.middleware.id}")
         
         # 检查是否使用Docker
-        if self.config.get('use_docker', False):
-            container_name = self.config.get('container_name', f"mysql-{self.middleware.id}")
+        if self._use_docker:
+            container_name = self._container_name
             subprocess.run(["docker", "stop", container_name], check=True)
         else:
             # 非Docker方式，使用系统服务
-            service_name = self.config.get('service_name', 'mysql')
+            service_name = self._service_name
             subprocess.run(["systemctl", "stop", service_name], check=True)
         
         # 更新中间件状态
@@ -165,25 +490,35 @@ class MySQLAdapter(MiddlewareAdapter):
         self.middleware.last_updated = timezone.now()
         self.middleware.save()
         
+        # 非Docker方式下，软件源更新与备份互不依赖，先在后台启动
+        apt_update = None
+        if not self._use_docker:
+            apt_update = subprocess.Popen(["apt-get", "update"], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        
         # 如果需要备份，先进行备份
         backup_path = None
         if backup:
-            backup_result = self.backup()
+            try:
+                backup_result = self.backup()
+            except Exception:
+                if apt_update is not None:
+                    apt_update.kill()
+                    apt_update.wait()
+                raise
             backup_path = backup_result.get('backup_path')
             logger.info(f"已备份MySQL中间件 {self.middleware.id} 到 {backup_path}")
         
         try:
             # 检查是否使用Docker
-            if self.config.get('use_docker', False):
-                container_name = self.config.get('container_name', f"mysql-{self.middleware.id}")
+            if self._use_docker:
+                container_name = self._container_name
                 image = f"mysql:{target_version}"
                 
-                # 停止并删除旧容器
-                subprocess.run(["docker", "stop", container_name], check=True)
-                subprocess.run(["docker", "rm", container_name], check=True)
-                
-                # 拉取新版本镜像
-                subprocess.run(["docker", "pull", image], check=True)
+                # 停止并删除旧容器的同时拉取新版本镜像
+                run_concurrently(
+                    [["docker", "stop", container_name], ["docker", "rm", container_name]],
+                    [["docker", "pull", image]]
+                )
                 
                 # 创建并启动新容器
                 port_mapping = f"{self.middleware.port}:3306"
@@ -191,7 +526,7 @@ class MySQLAdapter(MiddlewareAdapter):
                     "docker", "run", "-d",
                     "--name", container_name,
                     "-p", port_mapping,
-                    "-e", f"MYSQL_ROOT_PASSWORD={self.config.get('password')}"
+                    "-e", f"MYSQL_ROOT_PASSWORD={self._password}"
                 ]
                 
                 # 添加数据库名称
@@ -213,33 +548,23 @@ class MySQLAdapter(MiddlewareAdapter):
             else:
                 # 非Docker方式，使用系统包管理器升级
                 # 这里假设使用apt作为包管理器
-                subprocess.run(["apt-get", "update"], check=True)
+                _, stderr = apt_update.communicate()
+                if apt_update.returncode != 0:
+                    raise subprocess.CalledProcessError(apt_update.returncode, apt_update.args, stderr=stderr)
                 subprocess.run(["apt-get", "install", "-y", f"mysql-server={target_version}*"], check=True)
                 
                 # 重启服务
-                service_name = self.config.get('service_name', 'mysql')
+                service_name = self._service_name
                 subprocess.run(["systemctl", "restart", service_name], check=True)
             
             # 等待服务启动
-            max_retries = 10
-            retry_interval = 3
-            for i in range(max_retries):
-                try:
-                    # 尝试连接数据库
-                    connection = self._get_connection()
-                    connection.close()
-                    break
-                except Exception as e:
-                    if i == max_retries - 1:
-                        logger.error(f"MySQL服务启动失败: {str(e)}")
-                        raise
-                    logger.warning(f"等待MySQL服务启动 ({i+1}/{max_retries}): {str(e)}")
-                    time.sleep(retry_interval)
-            
-            # 验证服务是否成功启动
-            status_info = self._execute_query("SELECT VERSION() as version")
+            self._wait_until_ready()
+            
+            # 验证升级后的服务可以查询，并缓存服务端报告的版本
+            status_info = self._execute_query("SELECT VERSION()")
             if not status_info.get("success"):
                 raise Exception(f"无法获取MySQL版本信息: {status_info.get('error')}")
+            self._cached_version = status_info["result"][0][0]
             
             # 更新中间件版本和状态
             self.middleware.version = target_version
@@ -269,8 +594,12 @@ class MySQLAdapter(MiddlewareAdapter):
             raise
     
     @retry(max_attempts=3, delay=2, exceptions=(pymysql.Error, ConnectionError, Exception))
-    def get_status(self) -> Dict[str, Any]:
-        """获取MySQL状态信息"""
+    def get_status(self, detail: bool = False) -> Dict[str, Any]:
+        """获取MySQL状态信息
+        
+        Args:
+            detail: 是否附带完整的SHOW GLOBAL STATUS结果
+        """
         logger.info(f"获取MySQL中间件 {self.middleware.id} 状态信息")
         
         try:
@@ -285,50 +614,35 @@ class MySQLAdapter(MiddlewareAdapter):
                     "cpu_usage": 0
                 }
             
-            # 获取MySQL状态信息
-            status_info = self._execute_query("SHOW STATUS")
-            if not status_info.get("success"):
-                raise Exception(f"无法获取MySQL状态信息: {status_info.get('error')}")
-            
-            # 解析状态信息
-            status_dict = {}
-            for item in status_info.get("result", []):
-                if isinstance(item, dict) and 'Variable_name' in item and 'Value' in item:
-                    status_dict[item['Variable_name']] = item['Value']
+            # 需要完整状态时由get_full_status取全部状态变量，否则只取所需的几项
+            if detail:
+                status_dict = self.get_full_status()
+            else:
+                status_info = self._execute_query(STATUS_QUERY)
+                if not status_info.get("success"):
+                    raise Exception(f"无法获取MySQL状态信息: {status_info.get('error')}")
+                
+                # 解析状态信息
+                status_dict = dict(status_info["result"])
             
             # 获取运行时间
-            uptime_info = self._execute_query("SHOW GLOBAL STATUS LIKE 'Uptime'")
-            uptime = 0
-            if uptime_info.get("success") and uptime_info.get("result"):
-                for item in uptime_info.get("result", []):
-                    if item.get('Value'):
-                        try:
-                            uptime = int(item.get('Value', 0))
-                        except (ValueError, TypeError):
-                            uptime = 0
+            try:
+                uptime = int(status_dict.get('Uptime', 0))
+            except (ValueError, TypeError):
+                uptime = 0
             
             # 获取连接数
-            connections_info = self._execute_query("SHOW GLOBAL STATUS LIKE 'Threads_connected'")
-            connections = 0
-            if connections_info.get("success") and connections_info.get("result"):
-                for item in connections_info.get("result", []):
-                    if item.get('Value'):
-                        try:
-                            connections = int(item.get('Value', 0))
-                        except (ValueError, TypeError):
-                            connections = 0
+            try:
+                connections = int(status_dict.get('Threads_connected', 0))
+            except (ValueError, TypeError):
+                connections = 0
             
             # 获取内存使用情况
-            memory_info = self._execute_query("SHOW GLOBAL STATUS LIKE 'Innodb_buffer_pool_bytes_data'")
-            memory_usage = 0
-            if memory_info.get("success") and memory_info.get("result"):
-                for item in memory_info.get("result", []):
-                    if item.get('Value'):
-                        try:
-                            # 转换为MB
-                            memory_usage = float(item.get('Value', 0)) / (1024 * 1024)
-                        except (ValueError, TypeError):
-                            memory_usage = 0
+            try:
+                # 转换为MB
+                memory_usage = float(status_dict.get('Innodb_buffer_pool_bytes_data', 0)) / (1024 * 1024)
+            except (ValueError, TypeError):
+                memory_usage = 0
             
             # 在实际应用中，获取CPU使用率需要系统级别的监控
             # 这里简单模拟一个值
@@ -345,6 +659,10 @@ class MySQLAdapter(MiddlewareAdapter):
                 "last_checked": timezone.now()
             }
             
+            # 按需附带完整的状态变量
+            if detail:
+                status_response["status_variables"] = status_dict
+            
             logger.info(f"已获取MySQL中间件 {self.middleware.id} 状态信息")
             return status_response
             
@@ -361,6 +679,36 @@ class MySQLAdapter(MiddlewareAdapter):
                 "error": str(e)
             }
     
+    def get_full_status(self) -> Dict[str, Any]:
+        """获取完整的SHOW GLOBAL STATUS结果，供审计等需要全部状态变量的场景按需调用"""
+        full_status = self._execute_query("SHOW GLOBAL STATUS")
+        if not full_status.get("success"):
+            raise Exception(f"无法获取MySQL状态信息: {full_status.get('error')}")
+        return dict(full_status.get("result", []))
+    
+    @classmethod
+    def get_status_bulk(cls, adapters: List['MySQLAdapter']) -> List[Dict[str, Any]]:
+        """并发获取多个MySQL中间件的状态信息
+        
+        各适配器的get_status在共享线程池中并发执行，连接取自按主机共享的连接池，
+        总耗时由N次往返之和降为最慢的一次。
+        
+        Args:
+            adapters: MySQL适配器列表
+            
+        Returns:
+            与adapters顺序一致的状态信息列表
+        """
+        if not adapters:
+            return []
+        
+        with ThreadPoolExecutor(max_workers=min(BULK_STATUS_MAX_WORKERS, len(adapters)),
+                                thread_name_prefix="mysql-status") as executor:
+            results = list(executor.map(lambda adapter: adapter.get_status(), adapters))
+        
+        logger.info(f"已批量获取 {len(adapters)} 个MySQL中间件状态信息")
+        return results
+    
     @retry(max_attempts=3, delay=2, exceptions=(pymysql.Error, ConnectionError, Exception))
     def backup(self, backup_path: Optional[str] = None) -> Dict[str, Any]:
         """备份MySQL数据库"""
@@ -371,44 +719,25 @@ class MySQLAdapter(MiddlewareAdapter):
             backup_dir = self.config.get('backup_dir', '/tmp/mysql_backups')
             os.makedirs(backup_dir, exist_ok=True)
             timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            backup_path = os.path.join(backup_dir, f"mysql_{self.middleware.id}_{timestamp}.sql")
+            # 安装了zstd时默认压缩备份，否则退回未压缩的SQL文件
+            suffix = ".sql" + ZSTD_SUFFIX if shutil.which(ZSTD_COMPRESS_CMD[0]) else ".sql"
+            backup_path = os.path.join(backup_dir, f"mysql_{self.middleware.id}_{timestamp}{suffix}")
+        
+        # 以.zst结尾的备份文件经zstd流式压缩后写入磁盘
+        compress = backup_path.endswith(ZSTD_SUFFIX)
         
         try:
-            # 检查是否使用Docker
-            if self.config.get('use_docker', False):
-                container_name = self.config.get('container_name', f"mysql-{self.middleware.id}")
-                
-                # 使用Docker执行备份
-                backup_cmd = [
-                    "docker", "exec", container_name,
-                    "mysqldump",
-                    "-u", self.config.get('user'),
-                    f"--password={self.config.get('password')}",
-                    "--all-databases",
-                    "--single-transaction",
-                    "--quick",
-                    "--lock-tables=false"
-                ]
-                
+            backup_cmd = list(self._client_argv("mysqldump")) + list(MYSQLDUMP_ARGS)
+            env = self._client_env()
+            
+            if compress:
+                run_pipeline(backup_cmd, ZSTD_COMPRESS_CMD + [backup_path], env=env)
+            elif self._use_docker:
                 # 将输出重定向到备份文件
                 with open(backup_path, 'w') as backup_file:
-                    subprocess.run(backup_cmd, stdout=backup_file, check=True)
+                    subprocess.run(backup_cmd, stdout=backup_file, env=env, check=True)
             else:
-                # 非Docker方式，直接使用mysqldump
-                backup_cmd = [
-                    "mysqldump",
-                    "-h", self.middleware.host,
-                    "-P", str(self.middleware.port),
-                    "-u", self.config.get('user'),
-                    f"--password={self.config.get('password')}",
-                    "--all-databases",
-                    "--single-transaction",
-                    "--quick",
-                    "--lock-tables=false",
-                    "-r", backup_path
-                ]
-                
-                subprocess.run(backup_cmd, check=True)
+                subprocess.run(backup_cmd + ["-r", backup_path], env=env, check=True)
             
             # 检查备份文件是否创建成功
             if not os.path.exists(backup_path) or os.path.getsize(backup_path) == 0:
@@ -437,41 +766,16 @@ class MySQLAdapter(MiddlewareAdapter):
             raise FileNotFoundError(f"备份文件 {backup_path} 不存在")
         
         try:
-            # 检查是否使用Docker
-            if self.config.get('use_docker', False):
-                container_name = self.config.get('container_name', f"mysql-{self.middleware.id}")
-                
-                # 将备份文件复制到容器内
-                temp_path_in_container = "/tmp/mysql_backup.sql"
-                copy_cmd = ["docker", "cp", backup_path, f"{container_name}:{temp_path_in_container}"]
-                subprocess.run(copy_cmd, check=True)
-                
-                # 使用Docker执行恢复
-                restore_cmd = [
-                    "docker", "exec", container_name,
-                    "mysql",
-                    "-u", self.config.get('user'),
-                    f"--password={self.config.get('password')}",
-                    "-e", f"source {temp_path_in_container}"
-                ]
-                
-                subprocess.run(restore_cmd, check=True)
-                
-                # 清理临时文件
-                cleanup_cmd = ["docker", "exec", container_name, "rm", temp_path_in_container]
-                subprocess.run(cleanup_cmd, check=True)
+            # 备份内容直接通过标准输入导入mysql，Docker方式下经docker exec -i传入容器
+            restore_cmd = list(self._client_argv("mysql"))
+            env = self._client_env()
+            
+            if backup_path.endswith(ZSTD_SUFFIX):
+                # 压缩备份经zstd流式解压
+                run_pipeline(["zstd", "-d", "-c", "-q", backup_path], restore_cmd, env=env)
             else:
-                # 非Docker方式，直接使用mysql命令
-                restore_cmd = [
-                    "mysql",
-                    "-h", self.middleware.host,
-                    "-P", str(self.middleware.port),
-                    "-u", self.config.get('user'),
-                    f"--password={self.config.get('password')}",
-                    "-e", f"source {backup_path}"
-                ]
-                
-                subprocess.run(restore_cmd, check=True)
+                with open(backup_path, 'rb') as backup_file:
+                    subprocess.run(restore_cmd, stdin=backup_file, env=env, check=True)
             
             # 更新中间件状态
             self.middleware.status = 'running'
@@ -502,6 +806,14 @@ class MySQLAdapter(MiddlewareAdapter):
             if field not in config:
                 return False, f"缺少必要的配置项: {field}"
         
+        # 先探测端口，端口不可达时无需进行完整的认证握手
+        try:
+            with socket.create_connection((self.middleware.host, self.middleware.port), timeout=1.0):
+                pass
+        except OSError as e:
+            logger.error(f"MySQL配置验证失败，端口不可达: {str(e)}")
+            return False, f"配置验证失败: 端口 {self.middleware.host}:{self.middleware.port} 不可达"
+        
         # 验证连接参数
         try:
             # 创建临时连接测试配置有效性
@@ -512,8 +824,7 @@ class MySQLAdapter(MiddlewareAdapter):
                 password=config.get('password'),
                 database=config.get('database', ''),
                 charset=config.get('charset', 'utf8mb4'),
-                connect_timeout=config.get('connection_timeout', 10),
-                cursorclass=pymysql.cursors.DictCursor
+                connect_timeout=config.get('connection_timeout', 3)
             )
             test_connection.close()
             
@@ -539,66 +850,16 @@ class MySQLAdapter(MiddlewareAdapter):
         try:
             # 更新配置
             self.config.update(new_config)
+            self._load_cached_config()
             
-            # 检查是否使用Docker
-            if self.config.get('use_docker', False):
-                container_name = self.config.get('container_name', f"mysql-{self.middleware.id}")
-                
-                # 对于Docker容器，某些配置需要重新创建容器才能生效
-                # 这里仅处理可以热更新的配置
-                
-                # 例如，更新最大连接数
-                if 'max_connections' in new_config:
-                    max_connections = new_config.get('max_connections')
-                    set_cmd = [
-                        "docker", "exec", container_name,
-                        "mysql",
-                        "-u", self.config.get('user'),
-                        f"--password={self.config.get('password')}",
-                        "-e", f"SET GLOBAL max_connections = {max_connections};"
-                    ]
-                    subprocess.run(set_cmd, check=True)
-                
-                # 更新其他可热更新的参数
-                if 'wait_timeout' in new_config:
-                    wait_timeout = new_config.get('wait_timeout')
-                    set_cmd = [
-                        "docker", "exec", container_name,
-                        "mysql",
-                        "-u", self.config.get('user'),
-                        f"--password={self.config.get('password')}",
-                        "-e", f"SET GLOBAL wait_timeout = {wait_timeout};"
-                    ]
-                    subprocess.run(set_cmd, check=True)
-            else:
-                # 非Docker方式，直接使用mysql命令更新配置
-                # 这里仅处理可以热更新的配置
-                
-                # 例如，更新最大连接数
-                if 'max_connections' in new_config:
-                    max_connections = new_config.get('max_connections')
-                    set_cmd = [
-                        "mysql",
-                        "-h", self.middleware.host,
-                        "-P", str(self.middleware.port),
-                        "-u", self.config.get('user'),
-                        f"--password={self.config.get('password')}",
-                        "-e", f"SET GLOBAL max_connections = {max_connections};"
-                    ]
-                    subprocess.run(set_cmd, check=True)
-                
-                # 更新其他可热更新的参数
-                if 'wait_timeout' in new_config:
-                    wait_timeout = new_config.get('wait_timeout')
-                    set_cmd = [
-                        "mysql",
-                        "-h", self.middleware.host,
-                        "-P", str(self.middleware.port),
-                        "-u", self.config.get('user'),
-                        f"--password={self.config.get('password')}",
-                        "-e", f"SET GLOBAL wait_timeout = {wait_timeout};"
-                    ]
-                    subprocess.run(set_cmd, check=True)
+            # 可热更新的参数合并为一条SET GLOBAL语句，通过连接池执行
+            # 其他配置（Docker容器参数等）需要重新创建容器或重启服务才能生效
+            hot_updates = [(name, new_config[name]) for name in HOT_UPDATABLE_VARIABLES if name in new_config]
+            if hot_updates:
+                statement = "SET GLOBAL " + ", ".join(f"{name} = %s" for name, _ in hot_updates)
+                set_result = self._execute_query(statement, tuple(value for _, value in hot_updates))
+                if not set_result.get("success"):
+                    raise Exception(f"设置MySQL全局参数失败: {set_result.get('error')}")
             
             # 更新中间件配置记录
             self.middleware.config.config_data.update(new_config)
@@ -617,6 +878,7 @@ class MySQLAdapter(MiddlewareAdapter):
             
             # 恢复旧配置
             self.config = old_config
+            self._load_cached_config()
             
             # 更新中间件状态为错误
             self.middleware.status = 'error'
@@ -1,10 +1,17 @@
 import logging
 import json
 import os
-from typing import Dict, Any, Optional, Tuple, List, Set
+import re
+import time
+import fcntl
+import threading
+from functools import lru_cache, partial
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Tuple, List, Set, FrozenSet, Mapping
 from datetime import datetime
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, validate_model
 
+from . import file_writer, json_utils, time_utils
 from app.models.middleware import (
     RedisConfig, 
     MySQLConfig, 
@@ -16,15 +23,74 @@ from app.models.middleware import (
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 中间件类型与配置模型的对应关系
+CONFIG_MODELS = {
+    'redis': RedisConfig,
+    'mysql': MySQLConfig,
+    'mongodb': MongoDBConfig,
+    'elasticsearch': ElasticsearchConfig,
+    'rabbitmq': RabbitMQConfig
+}
+
+# 各类型预绑定的字段验证函数，直接执行字段校验而不构造模型实例
+CONFIG_VALIDATORS = {
+    middleware_type: partial(validate_model, config_model)
+    for middleware_type, config_model in CONFIG_MODELS.items()
+}
+
+# 各中间件类型的敏感配置项（只读）
+_SENSITIVE_CONFIGS: Mapping[str, FrozenSet[str]] = MappingProxyType({
+    'redis': frozenset({'port', 'password', 'data_dir'}),
+    'mysql': frozenset({'port', 'user', 'password', 'database', 'data_dir'}),
+    'mongodb': frozenset({'port', 'user', 'password', 'database', 'data_dir'}),
+    'elasticsearch': frozenset({'hosts', 'username', 'password'}),
+    'rabbitmq': frozenset({'port', 'username', 'password', 'virtual_host'})
+})
+_EMPTY_FROZENSET: FrozenSet[str] = frozenset()
+
+# 需要脱敏的配置项名称模式
+_SENSITIVE_KEY_RE = re.compile(r"password|secret|key|token|auth|credential", re.IGNORECASE)
+
+# 配置历史索引文件名，每行记录一个版本
+HISTORY_INDEX_FILE = 'index.jsonl'
+
+# 反向读取索引文件时的块大小
+INDEX_READ_BLOCK_SIZE = 8192
+
+# 每个中间件保留的配置版本数上限及最长保留天数（0表示不按时间清理）
+MAX_CONFIG_VERSIONS = int(os.environ.get('CONFIG_HISTORY_MAX_VERSIONS', '100'))
+MAX_CONFIG_AGE_DAYS = int(os.environ.get('CONFIG_HISTORY_MAX_AGE_DAYS', '0'))
+
+# 验证结果缓存的最大条目数
+VALIDATION_CACHE_SIZE = 1024
+
+
+def _run_validation(validator, config: Dict[str, Any]) -> Tuple[bool, Tuple[str, ...]]:
+    """使用预绑定的Pydantic验证函数验证配置，返回 (是否有效, 错误信息)"""
+    _, _, e = validator(config)
+    if e is None:
+        return True, ()
+    # 提取验证错误信息
+    return False, tuple(f"{error['loc'][0]}: {error['msg']}" for error in e.errors())
+
+
+@lru_cache(maxsize=VALIDATION_CACHE_SIZE)
+def _validate_cached(middleware_type: str, frozen_key: bytes) -> Tuple[bool, Tuple[str, ...]]:
+    """按规范化配置缓存验证结果，相同配置重复验证时跳过模型实例化"""
+    return _run_validation(CONFIG_VALIDATORS[middleware_type], json.loads(frozen_key))
+
+
 
 class ConfigValidationResult:
     """配置验证结果类"""
     
-    def __init__(self, is_valid: bool, errors: Optional[List[str]] = None, warnings: Optional[List[str]] = None):
+    def __init__(self, is_valid: bool, errors: Optional[List[str]] = None, warnings: Optional[List[str]] = None,
+                 ts: Optional[datetime] = None):
         self.is_valid = is_valid
         self.errors = errors or []
         self.warnings = warnings or []
-        self.timestamp = datetime.now()
+        # 批量验证时可传入同一时间戳复用
+        self.timestamp = ts or time_utils.now()
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
@@ -32,7 +98,7 @@ class ConfigValidationResult:
             "is_valid": self.is_valid,
             "errors": self.errors,
             "warnings": self.warnings,
-            "timestamp": self.timestamp.isoformat()
+            "timestamp": time_utils.isoformat(self.timestamp)
         }
     
     def __bool__(self) -> bool:
@@ -43,39 +109,187 @@ class ConfigValidationResult:
 class ConfigVersionManager:
     """配置版本管理器，用于跟踪配置变更历史"""
     
-    def __init__(self, history_dir: str = 'config_history'):
+    def __init__(self, history_dir: str = 'config_history', max_versions: int = MAX_CONFIG_VERSIONS,
+                 max_age_days: int = MAX_CONFIG_AGE_DAYS, sync_writes: bool = False):
         self.history_dir = history_dir
+        self.max_versions = max_versions
+        self.max_age_days = max_age_days
+        # 为False时版本文件由后台线程写入，save_config_version立即返回
+        self.sync_writes = sync_writes
+        # 版本文件名列表缓存：(中间件ID, limit) -> (来源文件的修改时间和大小, 文件名列表)
+        self._hist_cache: Dict[Tuple[str, int], Tuple[Tuple[int, int], List[str]]] = {}
+        self._hist_cache_lock = threading.RLock()
+        # 各中间件的版本数计数，首次保存时扫描目录初始化，之后随保存和清理增减
+        self._version_counts: Dict[str, int] = {}
+        self._version_counts_lock = threading.Lock()
         os.makedirs(history_dir, exist_ok=True)
     
-    def save_config_version(self, middleware_id: str, config: Dict[str, Any]) -> str:
+    def save_config_version(self, middleware_id: str, config: Dict[str, Any],
+                            ts: Optional[datetime] = None) -> str:
         """保存配置版本
         
         Args:
             middleware_id: 中间件ID
             config: 配置数据
+            ts: 版本时间，默认为当前时间
+            
+        Returns:
+            配置版本文件路径，异步写入时调用file_writer.flush()后文件才保证存在
+        """
+        now = ts or time_utils.now()
+        timestamp = now.strftime('%Y%m%d%H%M%S')
+        config_data = {
+            "version_id": timestamp,
+            "middleware_id": middleware_id,
+            "timestamp": time_utils.isoformat(now),
+            "config": config
+        }
+        return self._write_version(middleware_id, now, json_utils.dumps(config_data, indent=True))
+    
+    def save_config_version_from_bytes(self, middleware_id: str, payload: bytes,
+                                       from_version: Optional[str] = None,
+                                       ts: Optional[datetime] = None) -> str:
+        """将已序列化的版本文件内容原样保存为新版本，无需重新编码配置
+        
+        Args:
+            middleware_id: 中间件ID
+            payload: 版本文件内容
+            from_version: 回滚来源版本ID，指定时额外写入回滚记录文件
+            ts: 版本时间，默认为当前时间
             
         Returns:
             配置版本文件路径
         """
+        return self._write_version(middleware_id, ts or time_utils.now(), payload, from_version)
+    
+    def _write_version(self, middleware_id: str, now: datetime, payload: bytes,
+                       from_version: Optional[str] = None) -> str:
+        """写入版本文件、回滚记录和索引记录"""
         middleware_dir = os.path.join(self.history_dir, middleware_id)
         os.makedirs(middleware_dir, exist_ok=True)
         
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        timestamp = now.strftime('%Y%m%d%H%M%S')
         version_file = os.path.join(middleware_dir, f"config_{timestamp}.json")
-        
-        config_data = {
+        needs_prune = self._count_new_version(middleware_id, middleware_dir)
+        file_writer.submit_write(version_file, payload, sync=self.sync_writes)
+        
+        if from_version is not None:
+            rollback_note = {
+                "rollback": True,
+                "from_version": from_version,
+                "timestamp": time_utils.isoformat(now)
+            }
+            file_writer.submit_write(os.path.join(middleware_dir, f"rollback_{timestamp}.json"),
+                                     json_utils.dumps(rollback_note), sync=self.sync_writes)
+        
+        # 追加索引记录，读取历史时无需扫描目录；与版本文件按提交顺序写入
+        index_entry = {
             "version_id": timestamp,
-            "middleware_id": middleware_id,
-            "timestamp": datetime.now().isoformat(),
-            "config": config
+            "path": os.path.basename(version_file),
+            "timestamp": time_utils.isoformat(now)
         }
-        
-        with open(version_file, 'w') as f:
-            json.dump(config_data, f, indent=2)
+        file_writer.submit_write(os.path.join(middleware_dir, HISTORY_INDEX_FILE),
+                                 json_utils.dumps(index_entry) + b"\n", append=True,
+                                 sync=self.sync_writes)
         
         logger.info(f"已保存中间件 {middleware_id} 的配置版本 {timestamp}")
+        
+        # 超出保留数量时清理旧版本
+        if needs_prune:
+            self.prune(middleware_id)
+        
         return version_file
     
+    def _count_new_version(self, middleware_id: str, middleware_dir: str) -> bool:
+        """记录新增一个版本，返回是否需要清理
+        
+        超出保留数量的十分之一（至少1个）后才清理，分摊每次清理的目录扫描开销。
+        """
+        with self._version_counts_lock:
+            count = self._version_counts.get(middleware_id)
+            count = (len(self._scan_versions(middleware_dir)) if count is None else count) + 1
+            self._version_counts[middleware_id] = count
+        return count > self.max_versions + max(1, self.max_versions // 10)
+    
+    def _scan_versions(self, middleware_dir: str) -> List[os.DirEntry]:
+        """扫描配置版本文件，按文件名倒序排列（最新的版本在前面）"""
+        with os.scandir(middleware_dir) as entries:
+            versions = [entry for entry in entries
+                        if entry.name.startswith('config_') and entry.name.endswith('.json')]
+        versions.sort(key=lambda entry: entry.name, reverse=True)
+        return versions
+    
+    def prune(self, middleware_id: str, keep_last: Optional[int] = None,
+              max_age_days: Optional[int] = None) -> int:
+        """清理中间件的旧配置版本，最新的版本始终保留
+        
+        Args:
+            middleware_id: 中间件ID
+            keep_last: 保留的最大版本数，默认使用max_versions
+            max_age_days: 超过该天数的版本将被删除，0表示不按时间清理，默认使用max_age_days
+            
+        Returns:
+            删除的版本数
+        """
+        keep_last = self.max_versions if keep_last is None else keep_last
+        max_age_days = self.max_age_days if max_age_days is None else max_age_days
+        
+        middleware_dir = os.path.join(self.history_dir, middleware_id)
+        if not os.path.exists(middleware_dir):
+            return 0
+        
+        # 等待排队中的写入完成，避免清理时遗漏尚未落盘的版本
+        file_writer.flush()
+        versions = self._scan_versions(middleware_dir)
+        expired = versions[max(keep_last, 1):]
+        if max_age_days > 0:
+            cutoff = time.time() - max_age_days * 86400
+            # DirEntry.stat()结果会被缓存，不会重复系统调用
+            expired += [entry for entry in versions[1:max(keep_last, 1)]
+                        if entry.stat().st_mtime < cutoff]
+        if not expired:
+            return 0
+        
+        removed = set()
+        for entry in expired:
+            try:
+                os.unlink(entry.path)
+                removed.add(entry.name)
+            except OSError as e:
+                logger.warning(f"删除配置版本 {entry.name} 失败: {str(e)}")
+                continue
+            # 一并删除该版本的回滚记录
+            rollback_file = os.path.join(middleware_dir, entry.name.replace('config_', 'rollback_', 1))
+            if os.path.exists(rollback_file):
+                os.unlink(rollback_file)
+        
+        # 同步清理索引中对应的记录
+        index_file = os.path.join(middleware_dir, HISTORY_INDEX_FILE)
+        if removed and os.path.exists(index_file):
+            with open(index_file, 'rb+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    kept_lines = [line for line in f if not self._index_entry_in(line, removed)]
+                    f.seek(0)
+                    f.writelines(kept_lines)
+                    f.truncate()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        
+        with self._version_counts_lock:
+            self._version_counts[middleware_id] = len(versions) - len(removed)
+        
+        logger.info(f"已清理中间件 {middleware_id} 的 {len(removed)} 个旧配置版本")
+        return len(removed)
+    
+    @staticmethod
+    def _index_entry_in(line: bytes, file_names: Set[str]) -> bool:
+        """索引记录指向的文件是否在给定集合中，无法解析的记录视为需要清理"""
+        try:
+            return json_utils.loads(line)["path"] in file_names
+        except (ValueError, KeyError):
+            return True
+    
     def get_config_history(self, middleware_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         """获取配置历史记录
         
@@ -90,20 +304,99 @@ class ConfigVersionManager:
         if not os.path.exists(middleware_dir):
             return []
         
-        version_files = [f for f in os.listdir(middleware_dir) if f.endswith('.json')]
-        version_files.sort(reverse=True)  # 按文件名倒序排序，最新的版本在前面
-        
+        # 等待排队中的写入完成，读取到最新的历史
+        file_writer.flush()
         history = []
-        for file_name in version_files[:limit]:
+        version_files = self._list_version_files(middleware_id, middleware_dir, limit)
+        for file_name in version_files:
             try:
-                with open(os.path.join(middleware_dir, file_name), 'r') as f:
-                    config_data = json.load(f)
-                    history.append(config_data)
+                with open(os.path.join(middleware_dir, file_name), 'rb') as f:
+                    config_data = json_utils.loads(f.read())
             except Exception as e:
                 logger.warning(f"读取配置版本 {file_name} 失败: {str(e)}")
+                continue
+            
+            # 回滚生成的版本文件是来源版本的原样副本，版本信息以文件名和回滚记录为准
+            version_id = file_name[len('config_'):-len('.json')]
+            if config_data.get("version_id") != version_id:
+                config_data["version_id"] = version_id
+                try:
+                    with open(os.path.join(middleware_dir, f"rollback_{version_id}.json"), 'rb') as f:
+                        rollback_note = json_utils.loads(f.read())
+                    config_data["timestamp"] = rollback_note["timestamp"]
+                    config_data["rollback_info"] = rollback_note
+                except (OSError, ValueError, KeyError):
+                    pass
+            history.append(config_data)
         
         return history
     
+    def _list_version_files(self, middleware_id: str, middleware_dir: str, limit: int) -> List[str]:
+        """获取最近limit个版本的文件名，最新的版本在前面
+        
+        结果按索引文件（无索引时为目录）的修改时间和大小缓存，历史未变化时不再读取。
+        """
+        index_file = os.path.join(middleware_dir, HISTORY_INDEX_FILE)
+        try:
+            stat = os.stat(index_file)
+            has_index = True
+        except FileNotFoundError:
+            stat = os.stat(middleware_dir)
+            has_index = False
+        signature = (stat.st_mtime_ns, stat.st_size)
+        
+        cache_key = (middleware_id, limit)
+        with self._hist_cache_lock:
+            cached = self._hist_cache.get(cache_key)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+        
+        if has_index:
+            version_files = self._tail_index(index_file, limit)
+        else:
+            # 尚未建立索引的历史目录，退回扫描目录
+            version_files = [f for f in os.listdir(middleware_dir)
+                             if f.startswith('config_') and f.endswith('.json')]
+            version_files.sort(reverse=True)  # 按文件名倒序排序，最新的版本在前面
+            version_files = version_files[:limit]
+        
+        with self._hist_cache_lock:
+            self._hist_cache[cache_key] = (signature, version_files)
+        return version_files
+    
+    def _tail_index(self, index_file: str, limit: int) -> List[str]:
+        """从索引文件末尾反向读取最近limit个版本的文件名，最新的版本在前面"""
+        with open(index_file, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b""
+            # 按块向前读取，直到收集到足够的完整行
+            while position > 0 and data.count(b"\n") <= limit:
+                size = min(INDEX_READ_BLOCK_SIZE, position)
+                position -= size
+                f.seek(position)
+                data = f.read(size) + data
+        
+        lines = data.splitlines()
+        if position > 0:
+            # 第一行可能不完整
+            lines = lines[1:]
+        
+        file_names = []
+        for line in reversed(lines):
+            if len(file_names) >= limit:
+                break
+            try:
+                file_name = json_utils.loads(line)["path"]
+            except (ValueError, KeyError) as e:
+                logger.warning(f"解析配置历史索引记录失败: {str(e)}")
+                continue
+            # 同一秒内保存的版本会覆盖同名文件，索引中只保留一次
+            if file_name not in file_names:
+                file_names.append(file_name)
+        
+        return file_names
+    
     def get_config_version(self, middleware_id: str, version_id: str) -> Optional[Dict[str, Any]]:
         """获取指定版本的配置
         
@@ -114,14 +407,22 @@ class ConfigVersionManager:
         Returns:
             配置数据，如果版本不存在则返回None
         """
+        loaded = self._load_version(middleware_id, version_id)
+        if loaded is None:
+            return None
+        return loaded[0].get("config")
+    
+    def _load_version(self, middleware_id: str, version_id: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        """读取版本文件，返回 (版本数据, 文件原始内容)，版本不存在或读取失败时返回None"""
         version_file = os.path.join(self.history_dir, middleware_id, f"config_{version_id}.json")
+        file_writer.flush()
         if not os.path.exists(version_file):
             return None
         
         try:
-            with open(version_file, 'r') as f:
-                config_data = json.load(f)
-                return config_data.get("config")
+            with open(version_file, 'rb') as f:
+                raw = f.read()
+            return json_utils.loads(raw), raw
         except Exception as e:
             logger.error(f"读取配置版本 {version_id} 失败: {str(e)}")
             return None
@@ -136,19 +437,22 @@ class ConfigVersionManager:
         Returns:
             配置差异信息
         """
-        # 获取所有键的集合
-        all_keys = set(old_config.keys()) | set(new_config.keys())
+        # 直接对键视图做集合运算，每个分区只遍历一次
+        old_keys, new_keys = old_config.keys(), new_config.keys()
+        common_keys = old_keys & new_keys
         
-        added = {k: new_config[k] for k in all_keys if k in new_config and k not in old_config}
-        removed = {k: old_config[k] for k in all_keys if k in old_config and k not in new_config}
-        modified = {k: {"old": old_config[k], "new": new_config[k]} 
-                  for k in all_keys if k in old_config and k in new_config and old_config[k] != new_config[k]}
+        added = {k: new_config[k] for k in new_keys - old_keys}
+        removed = {k: old_config[k] for k in old_keys - new_keys}
+        # 同一对象无需深度比较
+        modified = {k: {"old": old, "new": new}
+                    for k in common_keys
+                    if (old := old_config[k]) is not (new := new_config[k]) and old != new}
         
         return {
             "added": added,
             "removed": removed,
             "modified": modified,
-            "unchanged": len(all_keys) - len(added) - len(removed) - len(modified)
+            "unchanged": len(common_keys) - len(modified)
         }
 
 
@@ -157,13 +461,8 @@ class ConfigValidator:
     
     def __init__(self):
         self.version_manager = ConfigVersionManager()
-        self.config_models = {
-            'redis': RedisConfig,
-            'mysql': MySQLConfig,
-            'mongodb': MongoDBConfig,
-            'elasticsearch': ElasticsearchConfig,
-            'rabbitmq': RabbitMQConfig
-        }
+        self.config_models = CONFIG_MODELS
+        self._validators = CONFIG_VALIDATORS
     
     def validate_config(self, middleware_type: str, config: Dict[str, Any]) -> ConfigValidationResult:
         """验证配置有效性
@@ -178,21 +477,19 @@ class ConfigValidator:
         logger.info(f"正在验证 {middleware_type} 中间件配置")
         
         # 检查中间件类型是否支持
-        if middleware_type.lower() not in self.config_models:
+        model_type = middleware_type.lower()
+        if model_type not in self.config_models:
             return ConfigValidationResult(False, [f"不支持的中间件类型: {middleware_type}"])
         
-        # 获取对应的配置模型
-        config_model = self.config_models[middleware_type.lower()]
-        
-        # 验证配置
+        # 以规范化JSON作为缓存键，含无法序列化的值时直接验证
         try:
-            # 使用Pydantic模型验证配置
-            validated_config = config_model(**config)
-            return ConfigValidationResult(True)
-        except ValidationError as e:
-            # 提取验证错误信息
-            errors = [f"{error['loc'][0]}: {error['msg']}" for error in json.loads(e.json())]
-            return ConfigValidationResult(False, errors)
+            frozen_key = json.dumps(config, sort_keys=True, separators=(",", ":")).encode()
+        except (TypeError, ValueError):
+            is_valid, errors = _run_validation(self._validators[model_type], config)
+        else:
+            is_valid, errors = _validate_cached(model_type, frozen_key)
+        
+        return ConfigValidationResult(is_valid, list(errors))
     
     def validate_config_change(self, middleware_id: str, middleware_type: str, 
                               old_config: Dict[str, Any], new_config: Dict[str, Any]) -> ConfigValidationResult:
@@ -221,58 +518,51 @@ class ConfigValidator:
         warnings = []
         errors = []
         
-        # 定义敏感配置项
-        sensitive_configs = {
-            'redis': {'port', 'password', 'data_dir'},
-            'mysql': {'port', 'user', 'password', 'database', 'data_dir'},
-            'mongodb': {'port', 'user', 'password', 'database', 'data_dir'},
-            'elasticsearch': {'hosts', 'username', 'password'},
-            'rabbitmq': {'port', 'username', 'password', 'virtual_host'}
-        }
+        middleware_type = middleware_type.lower()
+        modified = diff['modified']
+        removed = diff['removed']
         
         # 获取当前中间件类型的敏感配置项
-        sensitive_keys = sensitive_configs.get(middleware_type.lower(), set())
+        sensitive_keys = _SENSITIVE_CONFIGS.get(middleware_type, _EMPTY_FROZENSET)
         
-        # 检查敏感配置项的变更
-        for key in diff['modified']:
-            if key in sensitive_keys:
-                warnings.append(f"敏感配置项 {key} 已被修改")
+        # 检查敏感配置项的变更，按键名排序以保证提示顺序稳定
+        for key in sorted(sensitive_keys & modified.keys()):
+            warnings.append(f"敏感配置项 {key} 已被修改")
         
-        for key in diff['removed']:
-            if key in sensitive_keys:
-                errors.append(f"敏感配置项 {key} 不能被删除")
+        for key in sorted(sensitive_keys & removed.keys()):
+            errors.append(f"敏感配置项 {key} 不能被删除")
         
         # 特定中间件类型的验证逻辑
-        if middleware_type.lower() == 'redis':
+        if middleware_type == 'redis':
             # Redis特定验证
-            if 'maxmemory' in diff['modified'] and diff['modified']['maxmemory']['new'] < diff['modified']['maxmemory']['old']:
+            if 'maxmemory' in modified and modified['maxmemory']['new'] < modified['maxmemory']['old']:
                 warnings.append(f"Redis最大内存配置已减小，可能导致性能问题")
             
             # 检查持久化配置
-            if 'save' in diff['removed']:
+            if 'save' in removed:
                 warnings.append("Redis持久化配置已被移除，可能导致数据丢失")
             
             # 检查连接数限制
-            if 'max_connections' in diff['modified'] and diff['modified']['max_connections']['new'] < diff['modified']['max_connections']['old']:
+            if 'max_connections' in modified and modified['max_connections']['new'] < modified['max_connections']['old']:
                 warnings.append("Redis最大连接数已减小，可能导致连接拒绝")
         
-        elif middleware_type.lower() == 'mysql':
+        elif middleware_type == 'mysql':
             # MySQL特定验证
-            if 'max_connections' in diff['modified'] and diff['modified']['max_connections']['new'] < diff['modified']['max_connections']['old']:
+            if 'max_connections' in modified and modified['max_connections']['new'] < modified['max_connections']['old']:
                 warnings.append(f"MySQL最大连接数已减小，可能导致连接拒绝")
             
             # 检查缓冲区大小
-            if 'innodb_buffer_pool_size' in diff['modified'] and diff['modified']['innodb_buffer_pool_size']['new'] < diff['modified']['innodb_buffer_pool_size']['old']:
+            if 'innodb_buffer_pool_size' in modified and modified['innodb_buffer_pool_size']['new'] < modified['innodb_buffer_pool_size']['old']:
                 warnings.append("InnoDB缓冲池大小已减小，可能影响性能")
         
-        elif middleware_type.lower() == 'mongodb':
+        elif middleware_type == 'mongodb':
             # MongoDB特定验证
-            if 'max_pool_size' in diff['modified'] and diff['modified']['max_pool_size']['new'] < diff['modified']['max_pool_size']['old']:
+            if 'max_pool_size' in modified and modified['max_pool_size']['new'] < modified['max_pool_size']['old']:
                 warnings.append("MongoDB连接池大小已减小，可能影响并发性能")
         
-        elif middleware_type.lower() == 'elasticsearch':
+        elif middleware_type == 'elasticsearch':
             # Elasticsearch特定验证
-            if 'cluster.name' in diff['modified']:
+            if 'cluster.name' in modified:
                 errors.append("不允许修改Elasticsearch集群名称，这可能导致节点无法加入集群")
         
         # 保存配置变更记录
@@ -293,13 +583,10 @@ class ConfigValidator:
         Returns:
             安全的配置
         """
-        # 复制配置以避免修改原始数据
+        # 移除敏感信息，始终返回副本以免调用方修改原始配置
         safe_config = config.copy()
-        
-        # 移除敏感信息
-        sensitive_keys = {'password', 'secret', 'key', 'token', 'auth', 'credential'}
-        for key in list(safe_config.keys()):
-            if any(sensitive in key.lower() for sensitive in sensitive_keys):
+        for key in config:
+            if _SENSITIVE_KEY_RE.search(key):
                 safe_config[key] = '******'
         
         return safe_config
@@ -317,20 +604,13 @@ class ConfigValidator:
         logger.info(f"正在将中间件 {middleware_id} 的配置回滚到版本 {version_id}")
         
         # 获取指定版本的配置
-        config = self.version_manager.get_config_version(middleware_id, version_id)
+        loaded = self.version_manager._load_version(middleware_id, version_id)
+        config = loaded[0].get("config") if loaded else None
         if not config:
             return False, None, f"版本 {version_id} 不存在"
         
-        # 保存回滚操作的记录
-        rollback_note = {
-            "rollback": True,
-            "from_version": version_id,
-            "timestamp": datetime.now().isoformat()
-        }
-        config["_rollback_info"] = rollback_note
-        
-        # 保存为新版本
-        self.version_manager.save_config_version(middleware_id, config)
+        # 将读取到的版本文件原样保存为新版本，回滚记录单独写入，无需重新序列化配置
+        self.version_manager.save_config_version_from_bytes(middleware_id, loaded[1], from_version=version_id)
         
         return True, config, None
 
@@ -1,11 +1,18 @@
 import logging
+import asyncio
+import inspect
 import time
 import traceback
+import heapq
+import random
+import threading
+from collections import Counter, defaultdict
 from typing import Dict, Any, Optional, Callable, TypeVar, Generic, List, Tuple
-from functools import wraps
+from functools import wraps, lru_cache
 from datetime import datetime
 import os
-import json
+
+from . import file_writer, json_utils, time_utils
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -13,15 +20,62 @@ logger = logging.getLogger(__name__)
 # 定义泛型类型变量
 T = TypeVar('T')
 
+# 错误日志保留的文件数上限及最长保留天数（0表示不按时间清理）
+MAX_ERROR_LOGS = int(os.environ.get('ERROR_LOG_MAX_FILES', '1000'))
+MAX_ERROR_LOG_AGE_DAYS = int(os.environ.get('ERROR_LOG_MAX_AGE_DAYS', '0'))
+
+# 每个 (中间件ID, 错误类型) 记录错误日志的速率（次/秒）及突发上限
+ERROR_LOG_RATE = 10.0
+ERROR_LOG_BURST = 20
+
+
+class _TokenBucket:
+    """令牌桶限流器"""
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+    
+    def consume(self) -> bool:
+        """尝试取出一个令牌，桶空时返回False"""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+# 限流状态在进程内共享，各调用方按需创建的ErrorTracker实例共用同一份额度
+_rate_limiters: Dict[Tuple[str, str], _TokenBucket] = defaultdict(
+    lambda: _TokenBucket(ERROR_LOG_RATE, ERROR_LOG_BURST)
+)
+_dropped_errors: Counter = Counter()
+_rate_lock = threading.Lock()
+
+# 错误上下文中调用参数的最大长度
+CONTEXT_REPR_LIMIT = 4096
+
+
+def _error_context(args: tuple, kwargs: Dict[str, Any]) -> Dict[str, str]:
+    """构建错误上下文，截断过长的参数表示"""
+    return {"args": repr(args)[:CONTEXT_REPR_LIMIT], "kwargs": repr(kwargs)[:CONTEXT_REPR_LIMIT]}
+
+
 
 class OperationResult(Generic[T]):
     """操作结果封装类，用于统一处理操作结果和错误"""
     
-    def __init__(self, success: bool, data: Optional[T] = None, error: Optional[str] = None):
+    def __init__(self, success: bool, data: Optional[T] = None, error: Optional[str] = None,
+                 ts: Optional[datetime] = None):
         self.success = success
         self.data = data
         self.error = error
-        self.timestamp = datetime.now()
+        # 批量创建结果时可传入同一时间戳复用
+        self.timestamp = ts or time_utils.now()
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
@@ -29,7 +83,7 @@ class OperationResult(Generic[T]):
             "success": self.success,
             "data": self.data,
             "error": self.error,
-            "timestamp": self.timestamp.isoformat()
+            "timestamp": time_utils.isoformat(self.timestamp)
         }
     
     @classmethod
@@ -46,23 +100,42 @@ class OperationResult(Generic[T]):
 class ErrorTracker:
     """错误跟踪器，用于记录和分析错误"""
     
-    def __init__(self, log_dir: str = 'logs/errors'):
+    def __init__(self, log_dir: str = 'logs/errors', max_logs: int = MAX_ERROR_LOGS,
+                 max_age_days: int = MAX_ERROR_LOG_AGE_DAYS, sync_writes: bool = False):
         self.log_dir = log_dir
+        self.max_logs = max_logs
+        self.max_age_days = max_age_days
+        # 为False时错误日志由后台线程写入，log_error立即返回
+        self.sync_writes = sync_writes
+        # 错误日志文件数计数，首次记录时扫描目录初始化，之后随记录和清理增减
+        self._log_count: Optional[int] = None
+        self._log_count_lock = threading.Lock()
         os.makedirs(log_dir, exist_ok=True)
     
-    def log_error(self, middleware_id: str, operation: str, error: Exception, context: Dict[str, Any] = None) -> str:
+    def log_error(self, middleware_id: str, operation: str, error: Exception,
+                  context: Dict[str, Any] = None, ts: Optional[datetime] = None) -> Optional[str]:
         """记录错误信息
         
+        同一中间件的同类错误超出限流额度时只计数，不格式化调用栈也不写文件。
+        
         Args:
             middleware_id: 中间件ID
             operation: 操作名称
             error: 异常对象
             context: 上下文信息
+            ts: 错误发生时间，默认为当前时间
             
         Returns:
-            错误日志文件路径
+            错误日志文件路径，被限流时返回None；异步写入时调用file_writer.flush()后文件才保证存在
         """
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        rate_key = (middleware_id, type(error).__name__)
+        with _rate_lock:
+            if not _rate_limiters[rate_key].consume():
+                _dropped_errors[rate_key] += 1
+                return None
+        
+        now = ts or time_utils.now()
+        timestamp = now.strftime('%Y%m%d%H%M%S')
         error_id = f"{middleware_id}_{operation}_{timestamp}"
         log_file = os.path.join(self.log_dir, f"{error_id}.json")
         
@@ -70,19 +143,94 @@ class ErrorTracker:
             "error_id": error_id,
             "middleware_id": middleware_id,
             "operation": operation,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": time_utils.isoformat(now),
             "error_type": type(error).__name__,
             "error_message": str(error),
-            "traceback": traceback.format_exc(),
+            "traceback": "".join(traceback.format_exception(type(error), error, error.__traceback__)),
             "context": context or {}
         }
         
-        with open(log_file, 'w') as f:
-            json.dump(error_data, f, indent=2)
+        needs_prune = self._count_new_log()
+        file_writer.submit_write(log_file, json_utils.dumps(error_data, indent=True),
+                                 sync=self.sync_writes)
         
         logger.error(f"错误已记录到 {log_file}: {str(error)}")
+        
+        # 超出保留数量时清理旧日志
+        if needs_prune:
+            self.prune()
+        
         return log_file
     
+    def _count_new_log(self) -> bool:
+        """记录新增一个日志文件，返回是否需要清理
+        
+        超出保留数量的十分之一（至少1个）后才清理，分摊每次清理的目录扫描开销。
+        """
+        with self._log_count_lock:
+            if self._log_count is None:
+                self._log_count = len(self._scan_logs())
+            self._log_count += 1
+            return self._log_count > self.max_logs + max(1, self.max_logs // 10)
+    
+    @staticmethod
+    def get_dropped_counts() -> Dict[Tuple[str, str], int]:
+        """获取因限流未记录的错误数，键为 (中间件ID, 错误类型)"""
+        with _rate_lock:
+            return dict(_dropped_errors)
+    
+    def _scan_logs(self, middleware_id: Optional[str] = None) -> List[os.DirEntry]:
+        """扫描错误日志文件，可按中间件ID过滤"""
+        prefix = f"{middleware_id}_" if middleware_id else ""
+        with os.scandir(self.log_dir) as entries:
+            return [entry for entry in entries
+                    if entry.name.endswith('.json') and entry.name.startswith(prefix)]
+    
+    def prune(self, middleware_id: Optional[str] = None, keep_last: Optional[int] = None,
+              max_age_days: Optional[int] = None) -> int:
+        """清理旧的错误日志
+        
+        Args:
+            middleware_id: 可选的中间件ID过滤
+            keep_last: 保留的最大日志数，默认使用max_logs
+            max_age_days: 超过该天数的日志将被删除，0表示不按时间清理，默认使用max_age_days
+            
+        Returns:
+            删除的日志数
+        """
+        keep_last = self.max_logs if keep_last is None else keep_last
+        max_age_days = self.max_age_days if max_age_days is None else max_age_days
+        
+        # 等待排队中的写入完成，避免清理时遗漏尚未落盘的日志
+        file_writer.flush()
+        
+        # 文件名以中间件ID开头，不同中间件之间无法按文件名排序，改按修改时间排序；
+        # DirEntry.stat()结果会被缓存，不会重复系统调用
+        logs = self._scan_logs(middleware_id)
+        logs.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        expired = logs[keep_last:]
+        if max_age_days > 0:
+            cutoff = time.time() - max_age_days * 86400
+            expired += [entry for entry in logs[:keep_last] if entry.stat().st_mtime < cutoff]
+        
+        removed = 0
+        for entry in expired:
+            try:
+                os.unlink(entry.path)
+                removed += 1
+            except OSError as e:
+                logger.warning(f"删除错误日志 {entry.name} 失败: {str(e)}")
+        
+        with self._log_count_lock:
+            if middleware_id is None:
+                self._log_count = len(logs) - removed
+            elif self._log_count is not None:
+                self._log_count -= removed
+        
+        if removed:
+            logger.info(f"已清理 {removed} 个旧错误日志")
+        return removed
+    
     def get_error_history(self, middleware_id: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
         """获取错误历史记录
         
@@ -93,17 +241,17 @@ class ErrorTracker:
         Returns:
             错误历史记录列表
         """
-        error_files = [f for f in os.listdir(self.log_dir) if f.endswith('.json')]
-        error_files.sort(reverse=True)  # 按文件名倒序排序，最新的错误在前面
+        # 等待排队中的写入完成，读取到最新的记录
+        file_writer.flush()
+        
+        # 单次扫描过滤，只保留文件名倒序的前limit个，无需对全部文件排序
+        error_files = heapq.nlargest(limit, (entry.name for entry in self._scan_logs(middleware_id)))
         
         errors = []
-        for file_name in error_files[:limit]:
-            if middleware_id and not file_name.startswith(middleware_id):
-                continue
-                
+        for file_name in error_files:
             try:
-                with open(os.path.join(self.log_dir, file_name), 'r') as f:
-                    error_data = json.load(f)
+                with open(os.path.join(self.log_dir, file_name), 'rb') as f:
+                    error_data = json_utils.loads(f.read())
                     errors.append(error_data)
             except Exception as e:
                 logger.warning(f"读取错误日志 {file_name} 失败: {str(e)}")
@@ -115,7 +263,7 @@ class RecoveryManager:
     """恢复管理器，用于处理操作失败后的恢复策略"""
     
     def __init__(self):
-        self.error_tracker = ErrorTracker()
+        self.error_tracker = get_error_tracker()
     
     def with_recovery(self, middleware_id: str, operation: str, recovery_func: Optional[Callable] = None):
         """创建带有恢复机制的装饰器
@@ -129,33 +277,62 @@ class RecoveryManager:
             装饰器函数
         """
         def decorator(func):
+            def recover(e, args, kwargs):
+                """记录错误并执行恢复函数，返回恢复函数的结果（异步恢复函数返回协程）"""
+                logger.error(f"{operation} 操作失败: {str(e)}")
+                logger.info(f"尝试恢复 {operation} 操作")
+                return recovery_func(*args, **kwargs)
+            
+            def recovered(e, recovery_result):
+                logger.info(f"恢复操作完成: {recovery_result}")
+                return OperationResult.error_result(f"操作失败但已恢复: {str(e)}", recovery_result)
+            
+            def recovery_failed(e, recovery_error):
+                logger.error(f"恢复操作失败: {str(recovery_error)}")
+                return OperationResult.error_result(f"操作失败且恢复失败: {str(e)}; 恢复错误: {str(recovery_error)}")
+            
+            if asyncio.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    try:
+                        return OperationResult.success_result(await func(*args, **kwargs))
+                    except Exception as e:
+                        self.error_tracker.log_error(middleware_id, operation, e, _error_context(args, kwargs))
+                        if not recovery_func:
+                            logger.error(f"{operation} 操作失败: {str(e)}")
+                            return OperationResult.error_result(str(e))
+                        try:
+                            recovery_result = recover(e, args, kwargs)
+                            if inspect.isawaitable(recovery_result):
+                                recovery_result = await recovery_result
+                            return recovered(e, recovery_result)
+                        except Exception as recovery_error:
+                            return recovery_failed(e, recovery_error)
+                return async_wrapper
+            
             @wraps(func)
             def wrapper(*args, **kwargs):
-                context = {"args": str(args), "kwargs": str(kwargs)}
                 try:
                     result = func(*args, **kwargs)
                     return OperationResult.success_result(result)
                 except Exception as e:
-                    # 记录错误
-                    log_file = self.error_tracker.log_error(middleware_id, operation, e, context)
-                    logger.error(f"{operation} 操作失败: {str(e)}")
+                    # 记录错误，调用参数仅在失败时格式化
+                    self.error_tracker.log_error(middleware_id, operation, e, _error_context(args, kwargs))
                     
                     # 尝试恢复
                     if recovery_func:
                         try:
-                            logger.info(f"尝试恢复 {operation} 操作")
-                            recovery_result = recovery_func(*args, **kwargs)
-                            logger.info(f"恢复操作完成: {recovery_result}")
-                            return OperationResult.error_result(f"操作失败但已恢复: {str(e)}", recovery_result)
+                            return recovered(e, recover(e, args, kwargs))
                         except Exception as recovery_error:
-                            logger.error(f"恢复操作失败: {str(recovery_error)}")
-                            return OperationResult.error_result(f"操作失败且恢复失败: {str(e)}; 恢复错误: {str(recovery_error)}")
+                            return recovery_failed(e, recovery_error)
                     
+                    logger.error(f"{operation} 操作失败: {str(e)}")
                     return OperationResult.error_result(str(e))
             return wrapper
         return decorator
     
-    def retry_operation(self, max_attempts: int = 3, delay: int = 2, backoff: int = 2, exceptions: Tuple = (Exception,)):
+    def retry_operation(self, max_attempts: int = 3, delay: int = 2, backoff: int = 2, exceptions: Tuple = (Exception,),
+                        jitter: bool = True, max_total_wait: Optional[float] = None):
         """创建带有重试机制的装饰器
         
         Args:
@@ -163,16 +340,57 @@ class RecoveryManager:
             delay: 初始延迟时间（秒）
             backoff: 延迟时间的增长因子
             exceptions: 需要捕获的异常类型
+            jitter: 是否在 [0, 当前延迟] 内随机取等待时间，避免多个调用方同时重试
+            max_total_wait: 从首次调用起的总耗时上限（秒），下次重试将超出时不再重试
             
         Returns:
             装饰器函数
         """
         def decorator(func):
+            def next_sleep(e, attempt, current_delay, deadline):
+                """计算下次重试前的等待时间，不再重试时返回None"""
+                if attempt >= max_attempts:
+                    logger.error(f"操作失败，已达到最大重试次数: {str(e)}")
+                    return None
+                
+                sleep_for = random.uniform(0, current_delay) if jitter else current_delay
+                if deadline is not None and time.monotonic() + sleep_for > deadline:
+                    logger.error(f"操作失败，已超出重试总耗时上限 {max_total_wait} 秒: {str(e)}")
+                    return None
+                
+                logger.warning(f"操作失败，将在 {sleep_for:.2f} 秒后重试 ({attempt}/{max_attempts}): {str(e)}")
+                return sleep_for
+            
+            if asyncio.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    attempt = 0
+                    current_delay = delay
+                    last_exception = None
+                    deadline = None if max_total_wait is None else time.monotonic() + max_total_wait
+                    
+                    while attempt < max_attempts:
+                        try:
+                            return OperationResult.success_result(await func(*args, **kwargs))
+                        except exceptions as e:
+                            attempt += 1
+                            last_exception = e
+                            sleep_for = next_sleep(e, attempt, current_delay, deadline)
+                            if sleep_for is None:
+                                break
+                            # 等待期间不阻塞事件循环
+                            await asyncio.sleep(sleep_for)
+                            current_delay *= backoff
+                    
+                    return OperationResult.error_result(f"操作失败，已重试 {attempt} 次: {str(last_exception)}")
+                return async_wrapper
+            
             @wraps(func)
             def wrapper(*args, **kwargs):
                 attempt = 0
                 current_delay = delay
                 last_exception = None
+                deadline = None if max_total_wait is None else time.monotonic() + max_total_wait
                 
                 while attempt < max_attempts:
                     try:
@@ -181,13 +399,10 @@ class RecoveryManager:
                     except exceptions as e:
                         attempt += 1
                         last_exception = e
-                        
-                        if attempt >= max_attempts:
-                            logger.error(f"操作失败，已达到最大重试次数: {str(e)}")
+                        sleep_for = next_sleep(e, attempt, current_delay, deadline)
+                        if sleep_for is None:
                             break
-                        
-                        logger.warning(f"操作失败，将在 {current_delay} 秒后重试 ({attempt}/{max_attempts}): {str(e)}")
-                        time.sleep(current_delay)
+                        time.sleep(sleep_for)
                         current_delay *= backoff
                 
                 return OperationResult.error_result(f"操作失败，已重试 {attempt} 次: {str(last_exception)}")
@@ -195,11 +410,23 @@ class RecoveryManager:
         return decorator
 
 
+@lru_cache(maxsize=None)
+def get_error_tracker(log_dir: str = 'logs/errors') -> ErrorTracker:
+    """获取进程内共享的错误跟踪器，避免重复创建日志目录"""
+    return ErrorTracker(log_dir)
+
+
+@lru_cache(maxsize=None)
+def get_recovery_manager() -> RecoveryManager:
+    """获取进程内共享的恢复管理器"""
+    return RecoveryManager()
+
+
 class TransactionManager:
     """事务管理器，用于确保操作的原子性"""
     
     def __init__(self):
-        self.recovery_manager = RecoveryManager()
+        self.recovery_manager = get_recovery_manager()
     
     def transaction(self, middleware_id: str, operation: str):
         """创建事务装饰器
@@ -212,6 +439,37 @@ class TransactionManager:
             装饰器函数
         """
         def decorator(func):
+            def rollback(e):
+                """记录失败并回滚事务，返回失败结果"""
+                # 记录操作失败
+                logger.error(f"事务失败: {operation} 于中间件 {middleware_id}: {str(e)}")
+                
+                # 尝试回滚
+                try:
+                    # 这里应该实现回滚逻辑
+                    logger.info(f"尝试回滚事务: {operation} 于中间件 {middleware_id}")
+                    
+                    # 记录回滚成功
+                    logger.info(f"事务回滚成功: {operation} 于中间件 {middleware_id}")
+                    return OperationResult.error_result(f"操作失败但已回滚: {str(e)}")
+                    
+                except Exception as rollback_error:
+                    # 记录回滚失败
+                    logger.error(f"事务回滚失败: {operation} 于中间件 {middleware_id}: {str(rollback_error)}")
+                    return OperationResult.error_result(f"操作失败且回滚失败: {str(e)}; 回滚错误: {str(rollback_error)}")
+            
+            if asyncio.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    logger.info(f"开始事务: {operation} 于中间件 {middleware_id}")
+                    try:
+                        result = await func(*args, **kwargs)
+                        logger.info(f"事务成功完成: {operation} 于中间件 {middleware_id}")
+                        return OperationResult.success_result(result)
+                    except Exception as e:
+                        return rollback(e)
+                return async_wrapper
+            
             @wraps(func)
             def wrapper(*args, **kwargs):
                 # 记录操作开始
@@ -230,22 +488,7 @@ class TransactionManager:
                     return OperationResult.success_result(result)
                     
                 except Exception as e:
-                    # 记录操作失败
-                    logger.error(f"事务失败: {operation} 于中间件 {middleware_id}: {str(e)}")
-                    
-                    # 尝试回滚
-                    try:
-                        # 这里应该实现回滚逻辑
-                        logger.info(f"尝试回滚事务: {operation} 于中间件 {middleware_id}")
-                        
-                        # 记录回滚成功
-                        logger.info(f"事务回滚成功: {operation} 于中间件 {middleware_id}")
-                        return OperationResult.error_result(f"操作失败但已回滚: {str(e)}")
-                        
-                    except Exception as rollback_error:
-                        # 记录回滚失败
-                        logger.error(f"事务回滚失败: {operation} 于中间件 {middleware_id}: {str(rollback_error)}")
-                        return OperationResult.error_result(f"操作失败且回滚失败: {str(e)}; 回滚错误: {str(rollback_error)}")
+                    return rollback(e)
             return wrapper
         return decorator
 
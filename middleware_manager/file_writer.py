@@ -0,0 +1,179 @@
+import atexit
+import fcntl
+import logging
+import os
+import queue
+import threading
+from typing import List, Optional, Tuple
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 后台线程每批最多处理的写入数
+WRITE_BATCH_SIZE = 64
+
+
+def write_file(path: str, data: bytes, append: bool = False) -> None:
+    """写入文件
+
+    覆盖写入时先写临时文件再原子替换，进程崩溃不会留下不完整的文件；
+    追加模式下持有排他锁以免多进程交错写入。
+    """
+    if append:
+        _append_file(path, data)
+        return
+    os.replace(_write_temp(path, data, fsync=True), path)
+
+
+def _append_file(path: str, data: bytes) -> None:
+    """持有排他锁追加写入"""
+    with open(path, 'ab') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.write(data)
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _write_temp(path: str, data: bytes, fsync: bool) -> str:
+    """将内容写入path旁的临时文件，返回临时文件路径"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+        if fsync:
+            os.fsync(fd)
+    except BaseException:
+        os.close(fd)
+        os.unlink(tmp_path)
+        raise
+    os.close(fd)
+    return tmp_path
+
+
+def _fsync_dir(directory: str) -> None:
+    """fsync目录，使替换后的目录项落盘"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError as e:
+        logger.error(f"打开目录 {directory} 失败: {str(e)}")
+        return
+    try:
+        os.fsync(fd)
+    except OSError as e:
+        logger.error(f"同步目录 {directory} 失败: {str(e)}")
+    finally:
+        os.close(fd)
+
+
+def _write_batch(batch: List[Tuple[str, bytes, bool]]) -> None:
+    """批量写入
+
+    覆盖写入的临时文件逐个fsync后替换，整批替换完成后每个目录只fsync一次；
+    追加写入在替换完成后按提交顺序执行，索引记录不会先于其指向的文件出现。
+    """
+    replacements = []
+    for path, data, append in batch:
+        if append:
+            continue
+        try:
+            replacements.append((_write_temp(path, data, fsync=True), path))
+        except Exception as e:
+            logger.error(f"写入文件 {path} 失败: {str(e)}")
+
+    directories = set()
+    for tmp_path, path in replacements:
+        try:
+            os.replace(tmp_path, path)
+            directories.add(os.path.dirname(os.path.abspath(path)))
+        except OSError as e:
+            logger.error(f"写入文件 {path} 失败: {str(e)}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    for directory in directories:
+        _fsync_dir(directory)
+
+    for path, data, append in batch:
+        if append:
+            try:
+                _append_file(path, data)
+            except Exception as e:
+                logger.error(f"写入文件 {path} 失败: {str(e)}")
+
+
+class _WriteWorker:
+    """后台文件写入线程，按提交顺序批量落盘，避免阻塞调用方"""
+
+    def __init__(self, batch_size: int = WRITE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Tuple[str, bytes, bool]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, path: str, data: bytes, append: bool = False) -> None:
+        """提交一次写入，由后台线程异步完成"""
+        self._ensure_started()
+        self._queue.put((path, data, append))
+
+    def flush(self) -> None:
+        """阻塞直到已提交的写入全部完成"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            # 阻塞等待第一条写入，再非阻塞取出同批的其余写入
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                _write_batch(batch)
+            except Exception as e:
+                logger.error(f"批量写入 {len(batch)} 个文件失败: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+_worker = _WriteWorker()
+
+# 进程退出前写完队列中剩余的内容
+atexit.register(_worker.flush)
+
+
+def submit_write(path: str, data: bytes, append: bool = False, sync: bool = False) -> None:
+    """写入文件，默认交给后台线程异步完成
+
+    Args:
+        path: 文件路径
+        data: 文件内容
+        append: 是否追加写入
+        sync: 是否在当前线程同步写入，需要严格读写顺序的调用方使用
+    """
+    if sync:
+        write_file(path, data, append)
+    else:
+        _worker.submit(path, data, append)
+
+
+def flush() -> None:
+    """等待后台线程写完已提交的全部内容"""
+    _worker.flush()
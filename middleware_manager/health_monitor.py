@@ -1,23 +1,85 @@
 import logging
 import time
 import threading
-import json
+import heapq
+from array import array
+import math
+import mmap
+import struct
+import re
+import string
 import os
 import smtplib
-import requests
+from functools import lru_cache
+import asyncio
+import aiohttp
+from concurrent.futures import ThreadPoolExecutor, Future
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Dict, Any, List, Optional, Callable
-from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.conf import settings
 from django.utils import timezone
 
 # 导入错误处理模块
 from .error_handler import OperationResult
+from . import json_utils
 
 # 配置日志
 logger = logging.getLogger(__name__)  
 
+# 健康检查线程池的最大线程数
+HEALTH_CHECK_MAX_WORKERS = 32
+
+# 每个健康检查保留的历史记录数
+MAX_HISTORY = 100
+
+# 健康历史持久化目录，为空时历史只保存在内存中
+HEALTH_HISTORY_DIR = os.environ.get('HEALTH_HISTORY_DIR', '')
+
+# 持久化历史的定长槽位：时间戳(纳秒) u64、状态 u8、响应时间(微秒) u32，补齐到32字节
+_HISTORY_SLOT = struct.Struct("<QBI19x")
+
+# 告警发送线程数及待发送告警数上限，超出上限的告警直接丢弃
+ALERT_MAX_WORKERS = 4
+MAX_PENDING_ALERTS = 64
+
+# SMTP连接超时时间（秒）
+SMTP_TIMEOUT = 5
+
+# Webhook请求超时（秒）、并发连接数上限、DNS缓存时间（秒），以及网关类错误的重试次数和退避基数（秒）
+WEBHOOK_TIMEOUT = 10
+WEBHOOK_MAX_CONNECTIONS = 32
+WEBHOOK_DNS_CACHE_TTL = 300
+WEBHOOK_RETRIES = 2
+WEBHOOK_RETRY_BACKOFF = 0.2
+WEBHOOK_RETRY_STATUSES = frozenset({502, 503, 504})
+
+# 自适应检查间隔：健康时逐步放大到基础间隔的倍数上限，异常时迅速缩短到下限（秒）
+INTERVAL_BACKOFF = 1.5
+INTERVAL_MAX_FACTOR = 5
+INTERVAL_SPEEDUP_DIVISOR = 4
+MIN_CHECK_INTERVAL = 5
+
+# 单个健康检查的执行时间上限（秒），超过后跳过的轮次记录警告日志
+CHECK_CYCLE_TIMEOUT = 30
+
+# 内存字符串格式（如 '1.5G'、'100MB'）及单位对应的字节倍数
+_MEM_RE = re.compile(r"^\s*([\d.]+)\s*([KMGTkmgt]?)B?\s*$")
+_MEM_MULT = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+@lru_cache(maxsize=256)
+def _parse_memory(memory_str: str) -> float:
+    """解析内存字符串为字节数，无法解析时返回0；Redis反复上报相同的值，结果缓存复用"""
+    match = _MEM_RE.match(memory_str) if memory_str else None
+    if match is None:
+        return 0
+    try:
+        return float(match.group(1)) * _MEM_MULT[match.group(2).upper()]
+    except ValueError:
+        return 0
+
 class HealthStatus:
     """健康状态枚举"""
     HEALTHY = "healthy"
@@ -25,6 +87,120 @@ class HealthStatus:
     CRITICAL = "critical"
     UNKNOWN = "unknown"
 
+# 健康状态在历史记录中的数值编码
+_STATUS_NAMES = (HealthStatus.HEALTHY, HealthStatus.WARNING, HealthStatus.CRITICAL, HealthStatus.UNKNOWN)
+_STATUS_CODES = {name: code for code, name in enumerate(_STATUS_NAMES)}
+
+class HealthHistory:
+    """健康检查历史的环形缓冲区
+    
+    按列存储：响应时间和状态放在定长数值数组中，统计时无需逐条访问字典；
+    时间戳和消息放在并行列表中，只在读取历史时才组装成字典。
+    指定path时数值列同时写入内存映射文件，重启后可恢复（消息不持久化）。
+    """
+    
+    def __init__(self, capacity: int = MAX_HISTORY, path: Optional[str] = None):
+        self.capacity = capacity
+        self._timestamps: List[Optional[str]] = [None] * capacity
+        self._messages: List[Optional[str]] = [None] * capacity
+        self._response_times = array('d', bytes(8 * capacity))
+        self._statuses = array('B', bytes(capacity))
+        # 下一条记录的写入位置及已有记录数
+        self._head = 0
+        self._count = 0
+        self._mm: Optional[mmap.mmap] = None
+        if path:
+            try:
+                self._open(path)
+            except OSError as e:
+                logger.error(f"打开健康历史文件 {path} 失败: {str(e)}")
+    
+    def _open(self, path: str) -> None:
+        """映射历史文件并恢复其中的记录，文件大小不符时重新初始化"""
+        size = _HISTORY_SLOT.size * self.capacity
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+            self._mm = mmap.mmap(fd, size)
+        finally:
+            # 映射建立后即可关闭文件描述符
+            os.close(fd)
+        
+        # 槽位按写入顺序循环使用，时间戳最大的槽位之后即为写入位置
+        latest_ns = 0
+        for i in range(self.capacity):
+            ts_ns, status, rt_us = _HISTORY_SLOT.unpack_from(self._mm, i * _HISTORY_SLOT.size)
+            if not ts_ns:
+                continue
+            self._timestamps[i] = datetime.fromtimestamp(ts_ns / 1e9, tz=dt_timezone.utc).isoformat()
+            self._messages[i] = ""
+            self._statuses[i] = status if status < len(_STATUS_NAMES) else _STATUS_CODES[HealthStatus.UNKNOWN]
+            self._response_times[i] = rt_us / 1e6
+            self._count += 1
+            if ts_ns > latest_ns:
+                latest_ns = ts_ns
+                self._head = (i + 1) % self.capacity
+    
+    def close(self) -> None:
+        """解除历史文件的内存映射，写入由操作系统页缓存落盘"""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def append(self, timestamp: datetime, status: str, message: str, response_time: float) -> None:
+        """追加一条记录，缓冲区已满时覆盖最旧的记录"""
+        head = self._head
+        code = _STATUS_CODES.get(status, _STATUS_CODES[HealthStatus.UNKNOWN])
+        self._timestamps[head] = timestamp.isoformat()
+        self._messages[head] = message
+        self._response_times[head] = response_time
+        self._statuses[head] = code
+        if self._mm is not None:
+            _HISTORY_SLOT.pack_into(
+                self._mm, head * _HISTORY_SLOT.size,
+                int(timestamp.timestamp() * 1e9), code, min(int(response_time * 1e6), 0xFFFFFFFF)
+            )
+        self._head = (head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+    
+    def entries(self, limit: int = 0) -> List[Dict[str, Any]]:
+        """按时间先后返回最近limit条记录，limit<=0时返回全部"""
+        count = self._count if limit <= 0 else min(limit, self._count)
+        start = self._head - count
+        entries = []
+        for i in range(start, start + count):
+            i %= self.capacity
+            entries.append({
+                "timestamp": self._timestamps[i],
+                "status": _STATUS_NAMES[self._statuses[i]],
+                "message": self._messages[i],
+                "response_time": self._response_times[i]
+            })
+        return entries
+    
+    def stats(self) -> Dict[str, Any]:
+        """统计记录数、健康比例、平均及P99响应时间"""
+        count = self._count
+        if not count:
+            return {"count": 0, "healthy_ratio": None, "avg_response_time": None, "p99_response_time": None}
+        
+        # 未满时有效记录位于数组开头，统计与顺序无关
+        response_times = self._response_times[:count]
+        ranked = sorted(response_times)
+        return {
+            "count": count,
+            "healthy_ratio": self._statuses[:count].count(_STATUS_CODES[HealthStatus.HEALTHY]) / count,
+            "avg_response_time": sum(response_times) / count,
+            "p99_response_time": ranked[max(0, math.ceil(count * 0.99) - 1)]
+        }
+
 class HealthCheck:
     """健康检查基类"""
     
@@ -40,15 +216,35 @@ class HealthCheck:
         self.name = name
         self.description = description
         self.check_interval = check_interval
+        # 自适应间隔的基础值及上下限
+        self._base_interval = check_interval
+        self._min_interval = max(MIN_CHECK_INTERVAL, check_interval // 12)
+        self._max_interval = check_interval * INTERVAL_MAX_FACTOR
         self.last_check_time = None
+        # 最后一次检查的time.monotonic()时间，用于计算间隔；last_check_time仅用于展示
+        self.last_check_mono: float = 0.0
         self.last_status = HealthStatus.UNKNOWN
         self.last_message = "未执行检查"
-        self.history = []
+        # 环形缓冲区，超出容量时自动覆盖最旧的记录；配置了持久化目录时重启后可恢复
+        history_path = os.path.join(HEALTH_HISTORY_DIR, f"{name}.ring") if HEALTH_HISTORY_DIR else None
+        self.history = HealthHistory(MAX_HISTORY, history_path)
+        # 最后一次触发告警时的状态及time.monotonic()时间，恢复健康后清空
+        self._last_alerted_status: Optional[str] = None
+        self._last_alert_mono: float = 0.0
+        # 同一检查不会并发执行，不同检查之间互不阻塞
+        self._lock = threading.Lock()
     
     def check(self) -> Dict[str, Any]:
         """执行健康检查"""
         raise NotImplementedError("子类必须实现此方法")
     
+    def adapt_interval(self, status: str) -> None:
+        """根据检查结果调整检查间隔：健康时逐步放大，异常时迅速缩短"""
+        if status == HealthStatus.HEALTHY:
+            self.check_interval = min(self._max_interval, int(self.check_interval * INTERVAL_BACKOFF))
+        else:
+            self.check_interval = max(self._min_interval, self.check_interval // INTERVAL_SPEEDUP_DIVISOR)
+    
     def get_status(self) -> Dict[str, Any]:
         """获取当前状态"""
         return {
@@ -61,7 +257,11 @@ class HealthCheck:
     
     def get_history(self, limit: int = 10) -> List[Dict[str, Any]]:
         """获取历史记录"""
-        return self.history[-limit:] if limit > 0 else self.history
+        return self.history.entries(limit)
+    
+    def get_history_stats(self) -> Dict[str, Any]:
+        """获取历史记录的汇总统计"""
+        return self.history.stats()
 
 class MiddlewareHealthCheck(HealthCheck):
     """中间件健康检查"""
@@ -92,11 +292,12 @@ class MiddlewareHealthCheck(HealthCheck):
     
     def check(self) -> Dict[str, Any]:
         """执行中间件健康检查"""
-        start_time = time.time()
+        start_time = time.monotonic()
         try:
             # 获取中间件状态
             status_result = self.adapter.get_status()
-            end_time = time.time()
+            end_time = time.monotonic()
+            self.last_check_mono = end_time
             response_time = end_time - start_time
             
             if not status_result.get("success", False):
@@ -110,8 +311,9 @@ class MiddlewareHealthCheck(HealthCheck):
                     status = HealthStatus.CRITICAL
                     message = f"中间件未运行，当前状态: {status_info.get('status', '未知')}"
                 else:
-                    # 检查各项指标
+                    # 检查各项指标，记录过程中同时标记是否存在严重问题
                     issues = []
+                    has_critical = False
                     
                     # 检查内存使用
                     if "used_memory_human" in status_info:
@@ -122,6 +324,7 @@ class MiddlewareHealthCheck(HealthCheck):
                             memory_usage_percent = (memory_usage / memory_limit) * 100
                             if memory_usage_percent >= self.thresholds["memory_usage_critical"]:
                                 issues.append(f"内存使用率达到严重水平: {memory_usage_percent:.1f}%")
+                                has_critical = True
                             elif memory_usage_percent >= self.thresholds["memory_usage_warning"]:
                                 issues.append(f"内存使用率达到警告水平: {memory_usage_percent:.1f}%")
                     
@@ -130,6 +333,7 @@ class MiddlewareHealthCheck(HealthCheck):
                         cpu_usage = float(status_info.get("cpu_usage", 0))
                         if cpu_usage >= self.thresholds["cpu_usage_critical"]:
                             issues.append(f"CPU使用率达到严重水平: {cpu_usage:.1f}%")
+                            has_critical = True
                         elif cpu_usage >= self.thresholds["cpu_usage_warning"]:
                             issues.append(f"CPU使用率达到警告水平: {cpu_usage:.1f}%")
                     
@@ -142,12 +346,14 @@ class MiddlewareHealthCheck(HealthCheck):
                             connection_usage_percent = (connected / max_clients) * 100
                             if connection_usage_percent >= self.thresholds["connection_usage_critical"]:
                                 issues.append(f"连接使用率达到严重水平: {connection_usage_percent:.1f}%")
+                                has_critical = True
                             elif connection_usage_percent >= self.thresholds["connection_usage_warning"]:
                                 issues.append(f"连接使用率达到警告水平: {connection_usage_percent:.1f}%")
                     
                     # 检查响应时间
                     if response_time >= self.thresholds["response_time_critical"]:
                         issues.append(f"响应时间达到严重水平: {response_time:.2f}秒")
+                        has_critical = True
                     elif response_time >= self.thresholds["response_time_warning"]:
                         issues.append(f"响应时间达到警告水平: {response_time:.2f}秒")
                     
@@ -156,8 +362,6 @@ class MiddlewareHealthCheck(HealthCheck):
                         status = HealthStatus.HEALTHY
                         message = "中间件运行正常"
                     else:
-                        # 检查是否有严重问题
-                        has_critical = any("严重" in issue for issue in issues)
                         status = HealthStatus.CRITICAL if has_critical else HealthStatus.WARNING
                         message = "\n".join(issues)
             
@@ -167,18 +371,7 @@ class MiddlewareHealthCheck(HealthCheck):
             self.last_message = message
             
             # 记录历史
-            history_entry = {
-                "timestamp": self.last_check_time.isoformat(),
-                "status": status,
-                "message": message,
-                "response_time": response_time
-            }
-            self.history.append(history_entry)
-            
-            # 如果历史记录过多，删除旧记录
-            max_history = 100
-            if len(self.history) > max_history:
-                self.history = self.history[-max_history:]
+            self.history.append(self.last_check_time, status, message, response_time)
             
             return {
                 "success": True,
@@ -190,7 +383,8 @@ class MiddlewareHealthCheck(HealthCheck):
             
         except Exception as e:
             logger.error(f"执行健康检查失败: {str(e)}")
-            end_time = time.time()
+            end_time = time.monotonic()
+            self.last_check_mono = end_time
             response_time = end_time - start_time
             
             # 更新状态
@@ -199,13 +393,7 @@ class MiddlewareHealthCheck(HealthCheck):
             self.last_message = f"健康检查异常: {str(e)}"
             
             # 记录历史
-            history_entry = {
-                "timestamp": self.last_check_time.isoformat(),
-                "status": HealthStatus.CRITICAL,
-                "message": self.last_message,
-                "response_time": response_time
-            }
-            self.history.append(history_entry)
+            self.history.append(self.last_check_time, HealthStatus.CRITICAL, self.last_message, response_time)
             
             return {
                 "success": False,
@@ -216,24 +404,7 @@ class MiddlewareHealthCheck(HealthCheck):
     
     def _parse_memory_usage(self, memory_str: str) -> float:
         """解析内存使用字符串（如 '100MB'）为字节数"""
-        try:
-            if not memory_str or memory_str == "0":
-                return 0
-                
-            # 移除单位并转换为浮点数
-            value = float(''.join(c for c in memory_str if c.isdigit() or c == '.'))
-            
-            # 根据单位转换为字节
-            if 'K' in memory_str or 'k' in memory_str:
-                return value * 1024
-            elif 'M' in memory_str or 'm' in memory_str:
-                return value * 1024 * 1024
-            elif 'G' in memory_str or 'g' in memory_str:
-                return value * 1024 * 1024 * 1024
-            else:
-                return value
-        except Exception:
-            return 0
+        return _parse_memory(memory_str)
 
 class HealthMonitor:
     """健康监控系统"""
@@ -243,14 +414,40 @@ class HealthMonitor:
         self.alerters = []
         self.running = False
         self.monitor_thread = None
-        self.check_lock = threading.Lock()
+        # 健康检查专用线程池，与请求处理线程隔离
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 告警发送线程池及待发送告警数上限
+        self._alert_executor: Optional[ThreadPoolExecutor] = None
+        self._alert_slots = threading.Semaphore(MAX_PENDING_ALERTS)
+        # 仍在执行中的检查及其开始时间，未完成的检查不会被重复提交
+        self._pending: Dict[str, Tuple[Future, float]] = {}
+        # 按下次执行时间排序的最小堆：(time.monotonic()时间, 检查名称)
+        self._schedule: List[Tuple[float, str]] = []
+        self._schedule_lock = threading.Lock()
+        # 调度变化或停止时唤醒监控线程
+        self._wakeup = threading.Event()
     
     def add_check(self, check: HealthCheck) -> None:
         """添加健康检查"""
         self.checks[check.name] = check
+        with self._schedule_lock:
+            heapq.heappush(self._schedule, (time.monotonic(), check.name))
+        self._wakeup.set()
+    
+    def _reschedule(self, check_name: str, delay: float) -> None:
+        """将检查的下一轮提前到delay秒后，已排定的时间更早时保持不变"""
+        due_time = time.monotonic() + delay
+        with self._schedule_lock:
+            current = [entry for entry in self._schedule if entry[1] == check_name]
+            if current and min(current)[0] <= due_time:
+                return
+            self._schedule = [entry for entry in self._schedule if entry[1] != check_name]
+            self._schedule.append((due_time, check_name))
+            heapq.heapify(self._schedule)
+        self._wakeup.set()
     
     def remove_check(self, check_name: str) -> None:
-        """移除健康检查"""
+        """移除健康检查，堆中残留的调度项在出堆时丢弃"""
         if check_name in self.checks:
             del self.checks[check_name]
     
@@ -264,6 +461,12 @@ class HealthMonitor:
             return
             
         self.running = True
+        self._executor = ThreadPoolExecutor(
+            max_workers=min(HEALTH_CHECK_MAX_WORKERS, len(self.checks) + 4),
+            thread_name_prefix="healthcheck"
+        )
+        self._alert_executor = ThreadPoolExecutor(max_workers=ALERT_MAX_WORKERS, thread_name_prefix="alerter")
+        self._wakeup.clear()
         self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
         self.monitor_thread.start()
         logger.info("健康监控系统已启动")
@@ -271,41 +474,125 @@ class HealthMonitor:
     def stop(self) -> None:
         """停止监控"""
         self.running = False
+        self._wakeup.set()
         if self.monitor_thread:
             self.monitor_thread.join(timeout=5)
             self.monitor_thread = None
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._alert_executor:
+            self._alert_executor.shutdown(wait=False, cancel_futures=True)
+            self._alert_executor = None
+        self._pending.clear()
+        for alerter in self.alerters:
+            alerter.close()
+        _async_runner.stop()
         logger.info("健康监控系统已停止")
     
     def _monitor_loop(self) -> None:
-        """监控循环"""
+        """监控循环，只在最近一个检查到期时醒来"""
         while self.running:
-            # 检查所有健康检查
-            for check_name, check in list(self.checks.items()):
-                # 检查是否需要执行检查
-                if not check.last_check_time or \
-                   (timezone.now() - check.last_check_time).total_seconds() >= check.check_interval:
-                    with self.check_lock:
-                        try:
-                            # 执行健康检查
-                            result = check.check()
-                            
-                            # 如果状态为警告或严重，触发告警
-                            if result.get("status") in [HealthStatus.WARNING, HealthStatus.CRITICAL]:
-                                self._trigger_alert(check, result)
-                                
-                        except Exception as e:
-                            logger.error(f"执行健康检查 {check_name} 失败: {str(e)}")
+            with self._schedule_lock:
+                timeout = self._schedule[0][0] - time.monotonic() if self._schedule else None
+            
+            if timeout is None or timeout > 0:
+                # 等待到期，添加检查或停止监控时提前唤醒
+                self._wakeup.wait(timeout)
+                self._wakeup.clear()
+                continue
+            
+            with self._schedule_lock:
+                due_time, check_name = heapq.heappop(self._schedule)
+                check = self.checks.get(check_name)
+                if check is None:
+                    # 已移除的检查
+                    continue
+                now = time.monotonic()
+                # 落后太多时不补跑错过的轮次
+                heapq.heappush(self._schedule, (max(due_time + check.check_interval, now), check_name))
             
-            # 休眠一段时间
-            time.sleep(1)
+            pending = self._pending.get(check_name)
+            if pending is not None and not pending[0].done():
+                # 上一次检查仍未完成，跳过本轮
+                elapsed = now - pending[1]
+                if elapsed >= CHECK_CYCLE_TIMEOUT:
+                    logger.warning(f"健康检查 {check_name} 已执行 {elapsed:.0f} 秒仍未完成")
+                continue
+            
+            self._pending[check_name] = (self._executor.submit(self._run_check, check), now)
+    
+    def _run_check(self, check: HealthCheck) -> None:
+        """执行单个健康检查，状态为警告或严重时触发告警"""
+        if not check._lock.acquire(blocking=False):
+            # 该检查的上一次执行仍未结束
+            return
+        try:
+            # 执行健康检查
+            result = check.check()
+            # 按检查结果调整间隔；间隔缩短时立即重新调度，不必等待按旧间隔排定的下一轮
+            previous_interval = check.check_interval
+            check.adapt_interval(result.get("status"))
+            if check.check_interval < previous_interval:
+                self._reschedule(check.name, check.check_interval)
+            
+            # 状态变为警告或严重，或持续异常超过冷却时间时触发告警
+            status = result.get("status")
+            if status in (HealthStatus.WARNING, HealthStatus.CRITICAL):
+                if self._alert_due(check, status):
+                    self._trigger_alert(check, result)
+            else:
+                check._last_alerted_status = None
+                    
+        except Exception as e:
+            logger.error(f"执行健康检查 {check.name} 失败: {str(e)}")
+        finally:
+            check._lock.release()
+    
+    def _alert_due(self, check: HealthCheck, status: str) -> bool:
+        """状态与上次告警不同，或距上次告警已超过最短冷却时间时返回True"""
+        if not self.alerters:
+            return False
+        now = time.monotonic()
+        if status == check._last_alerted_status:
+            cooldown = min(alerter.cooldown_period for alerter in self.alerters)
+            if now - check._last_alert_mono < cooldown:
+                return False
+        check._last_alerted_status = status
+        check._last_alert_mono = now
+        return True
     
     def _trigger_alert(self, check: HealthCheck, result: Dict[str, Any]) -> None:
         """触发告警"""
+        if not self.alerters:
+            return
+        
+        # 详情只序列化一次，供各告警器共用
+        try:
+            result["_details_json"] = json_utils.dumps(result.get("details", {}), indent=True).decode('utf-8')
+        except Exception as e:
+            logger.error(f"序列化告警详情失败: {str(e)}")
+            result["_details_json"] = str(result.get("details", {}))
+        
+        # 告警在共享线程池中发送，慢速的SMTP/Webhook不会拖慢健康检查
         for alerter in self.alerters:
+            if self._alert_executor is None or not self._alert_slots.acquire(blocking=False):
+                logger.warning(f"待发送告警过多，丢弃 {alerter.name} 对 {check.name} 的告警")
+                continue
             try:
-                alerter.alert(check, result)
-            except Exception as e:
-                logger.error(f"触发告警失败: {str(e)}")
+                future = self._alert_executor.submit(self._safe_alert, alerter, check, result)
+            except RuntimeError:
+                # 线程池已关闭
+                self._alert_slots.release()
+                continue
+            future.add_done_callback(lambda _: self._alert_slots.release())
+    
+    def _safe_alert(self, alerter, check: HealthCheck, result: Dict[str, Any]) -> None:
+        """发送告警，异常只记录日志"""
+        try:
+            alerter.alert(check, result)
+        except Exception as e:
+            logger.error(f"触发告警失败: {str(e)}")
 
 class AlertLevel:
     """告警级别枚举"""
@@ -313,6 +600,35 @@ class AlertLevel:
     WARNING = "warning"
     CRITICAL = "critical"
 
+# 告警级别的先后顺序及健康状态对应的告警级别
+_LEVEL_ORDER = {AlertLevel.INFO: 0, AlertLevel.WARNING: 1, AlertLevel.CRITICAL: 2}
+_STATUS_TO_LEVEL = {
+    HealthStatus.HEALTHY: AlertLevel.INFO,
+    HealthStatus.WARNING: AlertLevel.WARNING,
+    HealthStatus.CRITICAL: AlertLevel.CRITICAL,
+    HealthStatus.UNKNOWN: AlertLevel.INFO
+}
+
+# 告警邮件的HTML模板及各状态对应的邮件主题
+_EMAIL_HTML_TEMPLATE = string.Template("""<html>
+<body>
+<h2>$subject</h2>
+<p><strong>中间件:</strong> $mw_name</p>
+<p><strong>类型:</strong> $mw_type</p>
+<p><strong>状态:</strong> $status</p>
+<p><strong>时间:</strong> $time</p>
+<p><strong>消息:</strong> $message</p>
+<p><strong>详情:</strong></p>
+<pre>$details</pre>
+</body>
+</html>
+""")
+_EMAIL_SUBJECTS = {
+    HealthStatus.WARNING: "[警告] {} 健康检查告警",
+    HealthStatus.CRITICAL: "[严重] {} 健康检查告警"
+}
+_EMAIL_DEFAULT_SUBJECT = "[信息] {} 健康检查通知"
+
 class AlertBase:
     """告警器基类"""
     
@@ -326,8 +642,11 @@ class AlertBase:
         """
         self.name = name
         self.min_level = min_level
-        self.last_alert_time = {}
+        # 各检查最后一次告警的time.monotonic()时间
+        self.last_alert_time: Dict[str, float] = {}
         self.cooldown_period = 300  # 默认冷却时间5分钟
+        # 告警在多个线程中发送，冷却状态的判断和更新需加锁
+        self._cooldown_lock = threading.Lock()
     
     def should_alert(self, check: HealthCheck, result: Dict[str, Any]) -> bool:
         """
@@ -340,30 +659,21 @@ class AlertBase:
         Returns:
             是否应该发送告警
         """
-        # 获取告警级别
-        status = result.get("status")
-        level = AlertLevel.INFO
-        if status == HealthStatus.WARNING:
-            level = AlertLevel.WARNING
-        elif status == HealthStatus.CRITICAL:
-            level = AlertLevel.CRITICAL
-        
         # 检查是否达到最小告警级别
-        if level == AlertLevel.INFO and self.min_level != AlertLevel.INFO:
-            return False
-        if level == AlertLevel.WARNING and self.min_level == AlertLevel.CRITICAL:
+        level = _STATUS_TO_LEVEL.get(result.get("status"), AlertLevel.INFO)
+        if _LEVEL_ORDER[level] < _LEVEL_ORDER.get(self.min_level, _LEVEL_ORDER[AlertLevel.WARNING]):
             return False
         
         # 检查冷却时间
         check_name = check.name
-        now = timezone.now()
-        if check_name in self.last_alert_time:
-            last_time = self.last_alert_time[check_name]
-            if (now - last_time).total_seconds() < self.cooldown_period:
+        now = time.monotonic()
+        with self._cooldown_lock:
+            last_time = self.last_alert_time.get(check_name)
+            if last_time is not None and now - last_time < self.cooldown_period:
                 return False
-        
-        # 更新最后告警时间
-        self.last_alert_time[check_name] = now
+            
+            # 更新最后告警时间
+            self.last_alert_time[check_name] = now
         return True
     
     def alert(self, check: HealthCheck, result: Dict[str, Any]) -> None:
@@ -376,6 +686,10 @@ class AlertBase:
     def _send_alert(self, check: HealthCheck, result: Dict[str, Any]) -> None:
         """发送告警的具体实现"""
         raise NotImplementedError("子类必须实现此方法")
+    
+    def close(self) -> None:
+        """释放告警器持有的连接等资源"""
+        pass
 
 class EmailAlerter(AlertBase):
     """邮件告警器"""
@@ -397,6 +711,44 @@ class EmailAlerter(AlertBase):
         self.sender = sender
         self.password = password
         self.recipients = recipients
+        # 复用的SMTP连接，发送失败时下次发送前重建
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._smtp_lock = threading.Lock()
+    
+    def _get_connection(self) -> smtplib.SMTP:
+        """获取可用的SMTP连接，需持有_smtp_lock调用"""
+        if self._smtp is not None:
+            try:
+                # 探测连接是否仍然可用
+                self._smtp.noop()
+                return self._smtp
+            except Exception:
+                self._discard_connection()
+        
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=SMTP_TIMEOUT)
+        server.starttls()
+        server.login(self.sender, self.password)
+        self._smtp = server
+        return server
+    
+    def _discard_connection(self) -> None:
+        """丢弃当前SMTP连接，需持有_smtp_lock调用"""
+        server, self._smtp = self._smtp, None
+        if server is not None:
+            try:
+                server.close()
+            except Exception:
+                pass
+    
+    def close(self) -> None:
+        """关闭复用的SMTP连接"""
+        with self._smtp_lock:
+            if self._smtp is not None:
+                try:
+                    self._smtp.quit()
+                except Exception:
+                    pass
+                self._discard_connection()
     
     def _send_alert(self, check: HealthCheck, result: Dict[str, Any]) -> None:
         """发送邮件告警"""
@@ -404,27 +756,20 @@ class EmailAlerter(AlertBase):
         message = result.get("message")
         
         # 构建邮件主题
-        if status == HealthStatus.WARNING:
-            subject = f"[警告] {check.name} 健康检查告警"
-        elif status == HealthStatus.CRITICAL:
-            subject = f"[严重] {check.name} 健康检查告警"
-        else:
-            subject = f"[信息] {check.name} 健康检查通知"
+        subject = _EMAIL_SUBJECTS.get(status, _EMAIL_DEFAULT_SUBJECT).format(check.name)
         
         # 构建邮件内容
-        body = f"""<html>
-<body>
-<h2>{subject}</h2>
-<p><strong>中间件:</strong> {check.middleware.name}</p>
-<p><strong>类型:</strong> {check.middleware.type}</p>
-<p><strong>状态:</strong> {status}</p>
-<p><strong>时间:</strong> {timezone.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-<p><strong>消息:</strong> {message}</p>
-<p><strong>详情:</strong></p>
-<pre>{json.dumps(result.get('details', {}), indent=2, ensure_ascii=False)}</pre>
-</body>
-</html>
-"""
+        details = result.get('_details_json') or json_utils.dumps(result.get('details', {}), indent=True).decode('utf-8')
+        middleware = check.middleware
+        body = _EMAIL_HTML_TEMPLATE.substitute(
+            subject=subject,
+            mw_name=middleware.name,
+            mw_type=middleware.type,
+            status=status,
+            time=timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
+            message=message,
+            details=details
+        )
         
         # 创建邮件
         msg = MIMEMultipart()
@@ -433,19 +778,71 @@ class EmailAlerter(AlertBase):
         msg['Subject'] = subject
         
         # 添加HTML内容
-        msg.attach(MIMEText(body, 'html'))
+        msg.attach(MIMEText(body, 'html', 'utf-8'))
         
         # 发送邮件
         try:
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.sender, self.password)
-            server.send_message(msg)
-            server.quit()
+            with self._smtp_lock:
+                try:
+                    self._get_connection().send_message(msg)
+                except Exception:
+                    # 连接状态未知，丢弃后由下次发送重建
+                    self._discard_connection()
+                    raise
             logger.info(f"已发送邮件告警: {subject}")
         except Exception as e:
             logger.error(f"发送邮件告警失败: {str(e)}")
 
+class AsyncAlertRunner:
+    """在独立线程的事件循环中执行异步告警请求，多个Webhook并发发送"""
+    
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = threading.Lock()
+    
+    def submit(self, coro) -> Future:
+        """提交协程到事件循环，返回concurrent.futures.Future"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="async-alerter", daemon=True)
+                self._thread.start()
+            return asyncio.run_coroutine_threadsafe(coro, self._loop)
+    
+    def get_session(self) -> aiohttp.ClientSession:
+        """获取共享的HTTP会话，只能在事件循环线程中调用"""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=WEBHOOK_MAX_CONNECTIONS, ttl_dns_cache=WEBHOOK_DNS_CACHE_TTL),
+                timeout=aiohttp.ClientTimeout(total=WEBHOOK_TIMEOUT)
+            )
+        return self._session
+    
+    async def _close_session(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    def stop(self) -> None:
+        """关闭HTTP会话并停止事件循环"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_session(), loop).result(timeout=WEBHOOK_TIMEOUT)
+        except Exception as e:
+            logger.error(f"关闭告警HTTP会话失败: {str(e)}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+# 各Webhook告警器共享的异步执行器
+_async_runner = AsyncAlertRunner()
+
 class WebhookAlerter(AlertBase):
     """Webhook告警器"""
     
@@ -459,7 +856,8 @@ class WebhookAlerter(AlertBase):
         """
         super().__init__("webhook_alerter", **kwargs)
         self.webhook_url = webhook_url
-        self.headers = headers or {"Content-Type": "application/json"}
+        # 请求体为预先序列化的JSON，需显式声明Content-Type
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
     
     def _send_alert(self, check: HealthCheck, result: Dict[str, Any]) -> None:
         """发送Webhook告警"""
@@ -477,15 +875,25 @@ class WebhookAlerter(AlertBase):
             "details": result.get("details", {})
         }
         
-        # 发送Webhook请求
+        # 在共享事件循环中发送，多个Webhook并发请求；告警线程等待发送结束，
+        # 在途请求数仍受MAX_PENDING_ALERTS限制
+        future = _async_runner.submit(self._async_post(json_utils.dumps(alert_data)))
+        self._log_result(future, status, message)
+    
+    async def _async_post(self, body: bytes) -> None:
+        """发送Webhook请求，网关类错误按指数退避重试"""
+        session = _async_runner.get_session()
+        for attempt in range(WEBHOOK_RETRIES + 1):
+            async with session.post(self.webhook_url, headers=self.headers, data=body) as response:
+                if response.status in WEBHOOK_RETRY_STATUSES and attempt < WEBHOOK_RETRIES:
+                    await asyncio.sleep(WEBHOOK_RETRY_BACKOFF * (2 ** attempt))
+                    continue
+                response.raise_for_status()
+                return
+    
+    def _log_result(self, future: Future, status: str, message: str) -> None:
         try:
-            response = requests.post(
-                self.webhook_url,
-                headers=self.headers,
-                json=alert_data,
-                timeout=10
-            )
-            response.raise_for_status()
+            future.result()
             logger.info(f"已发送Webhook告警: {status} - {message}")
         except Exception as e:
             logger.error(f"发送Webhook告警失败: {str(e)}")
@@ -0,0 +1,49 @@
+import json
+from typing import Any
+
+# orjson为可选依赖，未安装时退回标准库json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data: Any, indent: bool = False) -> bytes:
+    """序列化为UTF-8编码的JSON
+    
+    Args:
+        data: 待序列化的数据
+        indent: 是否以2个空格缩进输出
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else None)
+    return json.dumps(data, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+
+def loads(raw: Any) -> Any:
+    """反序列化JSON，支持bytes和str"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+class JSONFieldEncoder(json.JSONEncoder):
+    """模型JSONField的编码器，安装了orjson时使用orjson序列化"""
+    
+    def encode(self, o: Any) -> str:
+        if orjson is not None:
+            try:
+                return orjson.dumps(o, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+            except TypeError:
+                # orjson不支持的类型交给标准库处理
+                pass
+        return super().encode(o)
+
+
+class JSONFieldDecoder(json.JSONDecoder):
+    """模型JSONField的解码器，安装了orjson时使用orjson反序列化"""
+    
+    def decode(self, s: str, *args: Any, **kwargs: Any) -> Any:
+        if orjson is not None:
+            return orjson.loads(s)
+        return super().decode(s, *args, **kwargs)
@@ -2,6 +2,8 @@ from django.db import models
 from django.utils import timezone
 import uuid
 
+from .json_utils import JSONFieldEncoder, JSONFieldDecoder
+
 
 class Middleware(models.Model):
     """中间件模型，存储中间件基本信息"""
@@ -34,6 +36,10 @@ class Middleware(models.Model):
         verbose_name = '中间件'
         verbose_name_plural = '中间件'
         ordering = ['-last_updated']
+        indexes = [
+            models.Index(fields=['-last_updated']),
+            models.Index(fields=['type', 'status']),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.type})"
@@ -42,7 +48,7 @@ class Middleware(models.Model):
 class MiddlewareConfig(models.Model):
     """中间件配置模型，存储中间件的配置信息"""
     middleware = models.OneToOneField(Middleware, on_delete=models.CASCADE, related_name='config', verbose_name='中间件')
-    config_data = models.JSONField(verbose_name='配置数据')
+    config_data = models.JSONField(encoder=JSONFieldEncoder, decoder=JSONFieldDecoder, verbose_name='配置数据')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
     
@@ -75,8 +81,8 @@ class MiddlewareOperation(models.Model):
     middleware = models.ForeignKey(Middleware, on_delete=models.CASCADE, related_name='operations', verbose_name='中间件')
     operation_type = models.CharField(max_length=20, choices=OPERATION_TYPES, verbose_name='操作类型')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='状态')
-    params = models.JSONField(null=True, blank=True, verbose_name='操作参数')
-    result = models.JSONField(null=True, blank=True, verbose_name='操作结果')
+    params = models.JSONField(encoder=JSONFieldEncoder, decoder=JSONFieldDecoder, null=True, blank=True, verbose_name='操作参数')
+    result = models.JSONField(encoder=JSONFieldEncoder, decoder=JSONFieldDecoder, null=True, blank=True, verbose_name='操作结果')
     error_message = models.TextField(null=True, blank=True, verbose_name='错误信息')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
@@ -86,23 +92,36 @@ class MiddlewareOperation(models.Model):
         verbose_name = '中间件操作'
         verbose_name_plural = '中间件操作'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['middleware', '-created_at']),
+            models.Index(fields=['status', '-created_at']),
+            models.Index(fields=['middleware', 'status', '-created_at'], name='op_mw_status_created_idx'),
+            models.Index(fields=['operation_type', '-created_at']),
+        ]
     
     def __str__(self):
         return f"{self.middleware.name} - {self.get_operation_type_display()} ({self.get_status_display()})"
     
     def mark_completed(self, result=None):
-        """标记操作为已完成"""
+        """标记操作为已完成，仅对进行中的操作生效，返回是否更新成功"""
         self.status = 'completed'
         self.result = result or {'success': True}
         self.completed_at = timezone.now()
-        self.save()
+        return self._finish(result=self.result)
     
     def mark_failed(self, error_message):
-        """标记操作为失败"""
+        """标记操作为失败，仅对进行中的操作生效，返回是否更新成功"""
         self.status = 'failed'
         self.error_message = error_message
         self.completed_at = timezone.now()
-        self.save()
+        return self._finish(error_message=error_message)
+    
+    def _finish(self, **fields):
+        """以比较并交换的方式写入最终状态，不持有行锁"""
+        updated = MiddlewareOperation.objects.filter(pk=self.pk, status='in_progress').update(
+            status=self.status, completed_at=self.completed_at, updated_at=self.completed_at, **fields
+        )
+        return updated == 1
 
 
 class MiddlewareStatus(models.Model):
@@ -119,6 +138,9 @@ class MiddlewareStatus(models.Model):
         verbose_name = '中间件状态'
         verbose_name_plural = '中间件状态'
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['middleware', '-timestamp']),
+        ]
     
     def __str__(self):
         return f"{self.middleware.name} 状态 - {self.timestamp}"
\ No newline at end of file
@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Iterator, Optional
+
+import redis
+from django.conf import settings
+
+from . import json_utils
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 事件流的最长持续时间及心跳间隔（秒）
+OPERATION_EVENT_TIMEOUT = 300
+HEARTBEAT_INTERVAL = 15
+
+# 同步WSGI部署下每个事件流在整个持续时间内占用一个工作线程和一个Redis连接，
+# 单个进程同时保持的事件流数须小于其工作线程数（如gunicorn --threads），超出时拒绝新的事件流；
+# 可通过OPERATION_EVENTS_MAX_STREAMS配置
+MAX_EVENT_STREAMS = getattr(settings, 'OPERATION_EVENTS_MAX_STREAMS', 4)
+_stream_slots = threading.BoundedSemaphore(MAX_EVENT_STREAMS)
+
+# 操作进入这些状态后不再变化，事件流随之结束
+_TERMINAL_STATUSES = frozenset({'completed', 'failed'})
+
+
+@lru_cache(maxsize=None)
+def get_redis() -> redis.Redis:
+    """获取发布操作事件使用的Redis客户端，默认与Celery结果后端共用实例"""
+    url = getattr(settings, 'OPERATION_EVENTS_REDIS_URL', settings.CELERY_RESULT_BACKEND)
+    return redis.Redis.from_url(url)
+
+
+def channel_for(operation_id: Any) -> str:
+    """操作事件的发布频道"""
+    return f"mw:operation:{operation_id}"
+
+
+def _event(operation_id: Any, status: str, result: Any = None, error_message: str = None) -> bytes:
+    return json_utils.dumps({
+        "operation_id": str(operation_id),
+        "status": status,
+        "result": result,
+        "error_message": error_message
+    })
+
+
+def publish(operation_id: Any, status: str, result: Any = None, error_message: str = None) -> None:
+    """发布操作状态变化，发布失败只记录日志，不影响操作本身"""
+    try:
+        get_redis().publish(channel_for(operation_id), _event(operation_id, status, result, error_message))
+    except Exception as e:
+        logger.error(f"发布操作 {operation_id} 状态事件失败: {str(e)}")
+
+
+class _SlotStream:
+    """占用一个事件流名额的事件流，响应关闭时释放名额（即使事件流从未开始输出）"""
+
+    def __init__(self, events: Iterator[bytes]):
+        self._events = events
+        self._lock = threading.Lock()
+        self._released = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        return next(self._events)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        try:
+            self._events.close()
+        finally:
+            _stream_slots.release()
+
+
+def open_stream(operation) -> Optional[Iterator[bytes]]:
+    """占用一个事件流名额并返回操作的事件流，名额已满时返回None"""
+    if not _stream_slots.acquire(blocking=False):
+        return None
+    return _SlotStream(stream(operation))
+
+
+def stream(operation) -> Iterator[bytes]:
+    """
+    以Server-Sent Events格式输出操作的状态变化，直到操作结束或超时
+
+    Args:
+        operation: 操作记录对象
+    """
+    pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(channel_for(operation.operation_id))
+    try:
+        # 先订阅再读取当前状态，避免遗漏两者之间发生的状态变化
+        operation.refresh_from_db(fields=['status', 'result', 'error_message'])
+        yield b"data: " + _event(operation.operation_id, operation.status, operation.result, operation.error_message) + b"\n\n"
+        if operation.status in _TERMINAL_STATUSES:
+            return
+
+        deadline = time.monotonic() + OPERATION_EVENT_TIMEOUT
+        while time.monotonic() < deadline:
+            message = pubsub.get_message(timeout=HEARTBEAT_INTERVAL)
+            if message is None:
+                # 保持连接，便于代理和客户端发现断开
+                yield b": keepalive\n\n"
+                continue
+
+            data = message['data']
+            yield b"data: " + data + b"\n\n"
+            if json_utils.loads(data).get('status') in _TERMINAL_STATUSES:
+                return
+    finally:
+        pubsub.close()
@@ -1,6 +1,30 @@
+from django.core.cache import cache
 from rest_framework import serializers
 from .models import Middleware, MiddlewareConfig, MiddlewareOperation, MiddlewareStatus
 
+# 序列化结果的缓存时间（秒）
+SERIALIZER_CACHE_TIMEOUT = 30
+
+
+class CachedSerializerMixin:
+    """按主键和最后更新时间缓存序列化结果
+    
+    记录更新后last_updated随之变化，缓存键自动失效；列表中的每一行同样命中缓存。
+    """
+    cache_prefix = 'mw'
+    
+    def to_representation(self, instance):
+        last_updated = getattr(instance, 'last_updated', None)
+        if instance.pk is None or last_updated is None:
+            return super().to_representation(instance)
+        
+        key = f"{self.cache_prefix}:{instance.pk}:{last_updated.timestamp()}"
+        return cache.get_or_set(
+            key,
+            lambda: dict(super(CachedSerializerMixin, self).to_representation(instance)),
+            timeout=SERIALIZER_CACHE_TIMEOUT
+        )
+
 
 class MiddlewareConfigSerializer(serializers.ModelSerializer):
     """中间件配置序列化器"""
@@ -9,7 +33,7 @@ class MiddlewareConfigSerializer(serializers.ModelSerializer):
         fields = ['config_data']
 
 
-class MiddlewareSerializer(serializers.ModelSerializer):
+class MiddlewareSerializer(CachedSerializerMixin, serializers.ModelSerializer):
     """中间件序列化器"""
     config = MiddlewareConfigSerializer(read_only=True)
     
@@ -17,6 +41,11 @@ class MiddlewareSerializer(serializers.ModelSerializer):
         model = Middleware
         fields = ['id', 'name', 'type', 'host', 'port', 'version', 'status', 'last_updated', 'config']
         read_only_fields = ['id', 'last_updated']
+    
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """一次JOIN取出嵌套的配置，避免列表中每行再查询一次"""
+        return queryset.select_related('config')
 
 
 class MiddlewareCreateSerializer(serializers.ModelSerializer):
@@ -43,6 +72,14 @@ class MiddlewareOperationSerializer(serializers.ModelSerializer):
         fields = ['operation_id', 'middleware', 'middleware_name', 'operation_type', 'status', 
                   'params', 'result', 'error_message', 'created_at', 'updated_at', 'completed_at']
         read_only_fields = ['operation_id', 'status', 'result', 'error_message', 'created_at', 'updated_at', 'completed_at']
+    
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """JOIN中间件表取名称，并只查询序列化用到的列"""
+        return queryset.select_related('middleware').only(
+            'operation_id', 'middleware', 'operation_type', 'status', 'params', 'result',
+            'error_message', 'created_at', 'updated_at', 'completed_at', 'middleware__name'
+        )
 
 
 class MiddlewareStatusSerializer(serializers.ModelSerializer):
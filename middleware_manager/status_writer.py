@@ -0,0 +1,106 @@
+import atexit
+import logging
+import queue
+import threading
+from typing import Optional
+
+from django.db import close_old_connections, transaction
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 积压记录数达到该值时立即写入，否则按固定间隔（秒）写入
+STATUS_FLUSH_SIZE = 100
+STATUS_FLUSH_INTERVAL = 1.0
+
+# 每条INSERT语句插入的行数
+STATUS_BULK_BATCH_SIZE = 500
+
+# 待写入记录数上限，超出后丢弃新记录
+MAX_PENDING_STATUS = 10000
+
+
+class StatusWriter:
+    """中间件状态记录的后台批量写入器，多条记录合并为一次bulk_create"""
+
+    def __init__(self, flush_size: int = STATUS_FLUSH_SIZE, flush_interval: float = STATUS_FLUSH_INTERVAL,
+                 max_pending: int = MAX_PENDING_STATUS):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # 后台线程与flush()不会同时写入
+        self._write_lock = threading.Lock()
+
+    def submit(self, record) -> None:
+        """提交一条未保存的MiddlewareStatus，由后台线程写入"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            logger.warning("待写入的状态记录过多，丢弃新记录")
+            return
+        if self._queue.qsize() >= self.flush_size:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        """在当前线程写入全部积压记录"""
+        self._write_pending()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="status-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        """取出积压记录，在一个事务中批量插入；批量插入失败时逐条写入，只丢弃出错的记录"""
+        from .models import MiddlewareStatus
+
+        with self._write_lock:
+            batch = []
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+
+            # 后台线程长期存活，写入前丢弃已断开或超过CONN_MAX_AGE的连接
+            close_old_connections()
+            try:
+                with transaction.atomic():
+                    MiddlewareStatus.objects.bulk_create(batch, batch_size=STATUS_BULK_BATCH_SIZE)
+            except Exception as e:
+                logger.warning(f"批量写入 {len(batch)} 条状态记录失败，改为逐条写入: {str(e)}")
+                self._write_each(batch)
+
+    @staticmethod
+    def _write_each(batch) -> None:
+        """逐条写入状态记录，单条失败不影响其他记录"""
+        failed = 0
+        for record in batch:
+            try:
+                record.save(force_insert=True)
+            except Exception as e:
+                failed += 1
+                logger.error(f"写入状态记录失败: {str(e)}")
+        if failed:
+            logger.error(f"{failed}/{len(batch)} 条状态记录写入失败")
+
+
+status_writer = StatusWriter()
+
+# 进程退出前写完积压的记录
+atexit.register(status_writer.flush)
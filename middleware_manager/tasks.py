@@ -1,76 +1,279 @@
 from celery import shared_task
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
 from django.utils import timezone
-from django.db import transaction
+from django.core.cache import cache
+from django.db import transaction, connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
 from .models import Middleware, MiddlewareOperation, MiddlewareConfig
+from . import operation_events
+from . import json_utils
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
-@shared_task
-def process_middleware_operation(operation_id, operation_type, middleware_id, params=None):
+# celery-batches为可选依赖，安装后操作任务按批次处理
+try:
+    from celery_batches import Batches
+except ImportError:
+    Batches = None
+
+# 中间件操作大部分时间在等待外部命令，由gevent协程池worker消费，
+# worker启动时自动monkey patch，time.sleep等阻塞调用只挂起当前协程：
+# celery -A django_server worker -P gevent -c 500 -Q middleware_ops -Ofair
+# 安装了celery-batches时该worker须不限制预取，否则批次无法凑满，只在此worker上设置：
+# celery -A django_server worker -P gevent -c 500 -Q middleware_ops -Ofair --prefetch-multiplier=0
+# 升级等长耗时操作使用的队列，由单独的worker消费：
+# celery -A django_server worker -Q upgrades --concurrency=4 --prefetch-multiplier=1 -Ofair
+LONG_RUNNING_QUEUE = 'upgrades'
+
+# 状态信息的缓存时间（秒）
+STATUS_CACHE_TIMEOUT = 5
+
+# 各数据库在服务端按顶层键覆盖JSON配置的表达式，与Python中dict合并的语义一致（值为null时写入null，不删除键）；
+# MySQL/SQLite的表达式为 (外层模板, 每个键追加的参数占位)，未列出的数据库在Python中合并后整体写回
+_JSON_MERGE_SQL = {
+    'postgresql': "config_data || %s::jsonb",
+    'mysql': ("JSON_SET(config_data{})", ", %s, CAST(%s AS JSON)"),
+    'sqlite': ("json_set(config_data{})", ", %s, json(%s)"),
+}
+
+# 进行中的操作超过该时间（秒）未刷新租约，视为执行它的worker已退出，可被重新投递的任务再次认领；
+# 操作执行期间按心跳间隔刷新updated_at，长耗时操作不会因租约过期被重复执行
+OPERATION_LEASE_TIMEOUT = 300
+OPERATION_HEARTBEAT_INTERVAL = 60
+
+# 每批最多处理的操作数及批次最长等待时间（秒）
+OPERATION_BATCH_SIZE = 50
+OPERATION_BATCH_INTERVAL = 2
+
+
+def _operation_item(operation_id, operation_type, middleware_id, params=None):
+    """将任务参数整理为 (操作ID, 操作类型, 中间件ID)
+    
+    升级前投递的消息还带有操作参数，参数以操作记录为准，忽略消息中的参数。
     """
-    处理中间件操作的异步任务
+    return str(operation_id), operation_type, str(middleware_id)
+
+
+def _delivery_queue(request):
+    """任务消息投递到的队列，无法确定时返回None（按默认路由投递）"""
+    return (getattr(request, 'delivery_info', None) or {}).get('routing_key')
+
+
+def _process_operations(items, queues=None):
+    """
+    批量处理中间件操作
     
     Args:
-        operation_id: 操作ID
-        operation_type: 操作类型 (start, stop, restart, upgrade, config_update)
-        middleware_id: 中间件ID
-        params: 操作参数
+        items: (操作ID, 操作类型, 中间件ID) 列表，操作参数从操作记录中读取
+        queues: 操作ID到其消息原投递队列的映射，重新投递时沿用
+    
+    Returns:
+        与items一一对应的处理结果列表
     """
+    # 本批操作的认领共用同一个时间戳
+    now = timezone.now()
+    
+    # 逐条以比较并交换的方式认领等待中或租约已过期的操作，不持有行锁
+    claimable = Q(status='pending') | Q(status='in_progress', updated_at__lt=now - timedelta(seconds=OPERATION_LEASE_TIMEOUT))
+    claimed = set()
+    for operation_id, _, _ in items:
+        if MiddlewareOperation.objects.filter(claimable, operation_id=operation_id).update(
+            status='in_progress', updated_at=now
+        ):
+            claimed.add(operation_id)
+            operation_events.publish(operation_id, 'in_progress')
+        else:
+            logger.warning(f"操作 {operation_id} 不存在或已被其他任务认领")
+    
+    _requeue_in_progress([item for item in items if item[0] not in claimed], queues or {})
+    
+    operations = {str(pk): operation for pk, operation in MiddlewareOperation.objects.in_bulk(claimed).items()}
+    
+    # 一次JOIN查询本批涉及的全部中间件及其配置
+    middlewares = {
+        str(pk): middleware
+        for pk, middleware in Middleware.objects.select_related('config').in_bulk({item[2] for item in items if item[0] in claimed}).items()
+    }
+    
+    runnable = [
+        (operations[operation_id], operation_id, operation_type, middlewares.get(middleware_id), middleware_id)
+        for operation_id, operation_type, middleware_id in items
+        if operation_id in operations
+    ]
+    if len(runnable) > 1:
+        # 同一批次的操作并发执行，不因排队累加各自的耗时
+        with ThreadPoolExecutor(max_workers=len(runnable), thread_name_prefix="middleware-op") as executor:
+            results = dict(zip((args[1] for args in runnable), executor.map(lambda args: _run_in_thread(*args), runnable)))
+    else:
+        results = {args[1]: _run_operation(*args) for args in runnable}
+    
+    return [
+        results.get(operation_id) or {"success": False, "error": "操作不存在或已被认领", "operation_id": operation_id}
+        for operation_id, _, _ in items
+    ]
+
+
+def _run_in_thread(*args):
+    """在线程池中执行操作，结束后关闭该线程的数据库连接"""
+    try:
+        return _run_operation(*args)
+    finally:
+        connection.close()
+
+
+def _json_merge_expression(vendor, new_config):
+    """构建在服务端浅合并配置的表达式，数据库不支持或键名需要转义时返回None"""
+    merge_sql = _JSON_MERGE_SQL.get(vendor)
+    if merge_sql is None or not new_config:
+        return None
+    if isinstance(merge_sql, str):
+        return RawSQL(merge_sql, [json_utils.dumps(new_config).decode('utf-8')])
+    
+    # 键名作为JSON路径传入，含引号或反斜杠的键名交给Python合并
+    if any('"' in key or '\\' in key for key in new_config):
+        return None
+    template, pair = merge_sql
+    params = []
+    for key, value in new_config.items():
+        params += [f'$."{key}"', json_utils.dumps(value).decode('utf-8')]
+    return RawSQL(template.format(pair * len(new_config)), params)
+
+
+def _requeue_in_progress(items, queues):
+    """
+    未能认领但仍在进行中的操作可能是worker退出后重新投递的消息，
+    租约过期后再投递到原队列，届时操作若已停止刷新租约则重新认领执行
+    """
+    if not items:
+        return
+    in_progress = {
+        str(pk) for pk in MiddlewareOperation.objects.filter(
+            operation_id__in=[item[0] for item in items], status='in_progress'
+        ).values_list('operation_id', flat=True)
+    }
+    for operation_id, operation_type, middleware_id in items:
+        if operation_id in in_progress:
+            process_middleware_operation.apply_async(
+                args=[operation_id, operation_type, middleware_id],
+                countdown=OPERATION_LEASE_TIMEOUT,
+                queue=queues.get(operation_id)
+            )
+
+
+@contextmanager
+def _lease_heartbeat(operation_id):
+    """操作执行期间在后台线程中定期刷新updated_at，保持对操作的租约"""
+    stop = threading.Event()
+    
+    def _beat():
+        try:
+            while not stop.wait(OPERATION_HEARTBEAT_INTERVAL):
+                try:
+                    MiddlewareOperation.objects.filter(operation_id=operation_id, status='in_progress').update(
+                        updated_at=timezone.now()
+                    )
+                except Exception as e:
+                    logger.error(f"刷新操作 {operation_id} 的租约失败: {str(e)}")
+        finally:
+            connection.close()
+    
+    thread = threading.Thread(target=_beat, name=f"lease-{operation_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _dispatch_operation(operation_type, middleware, params):
+    """根据操作类型执行相应的操作"""
+    if operation_type == "start":
+        return start_middleware_service(middleware)
+    elif operation_type == "stop":
+        return stop_middleware_service(middleware)
+    elif operation_type == "restart":
+        return restart_middleware_service(middleware)
+    elif operation_type == "upgrade":
+        return upgrade_middleware_service(middleware, params)
+    elif operation_type == "config_update":
+        return update_middleware_config(middleware, params)
+    else:
+        raise ValueError(f"不支持的操作类型: {operation_type}")
+
+
+def _run_operation(operation, operation_id, operation_type, middleware, middleware_id):
+    """执行单个已认领的操作并记录结果"""
     logger.info(f"开始处理中间件操作: {operation_id} ({operation_type})")
     
     try:
-        # 获取操作记录
-        with transaction.atomic():
-            operation = MiddlewareOperation.objects.select_for_update().get(operation_id=operation_id)
-            
-            # 更新操作状态为进行中
-            operation.status = 'in_progress'
-            operation.updated_at = timezone.now()
-            operation.save()
-        
-        # 获取中间件
-        try:
-            middleware = Middleware.objects.get(id=middleware_id)
-        except Middleware.DoesNotExist:
+        if middleware is None:
             raise ValueError(f"中间件 {middleware_id} 不存在")
-        
-        # 根据操作类型执行相应的操作
-        if operation_type == "start":
-            result = start_middleware_service(middleware)
-        elif operation_type == "stop":
-            result = stop_middleware_service(middleware)
-        elif operation_type == "restart":
-            result = restart_middleware_service(middleware)
-        elif operation_type == "upgrade":
-            result = upgrade_middleware_service(middleware, params)
-        elif operation_type == "config_update":
-            result = update_middleware_config(middleware, params)
-        else:
-            raise ValueError(f"不支持的操作类型: {operation_type}")
-        
-        # 更新操作状态为已完成
-        with transaction.atomic():
-            operation.refresh_from_db()
-            operation.mark_completed(result)
-        
-        logger.info(f"操作 {operation_id} ({operation_type}) 成功完成")
-        return {"success": True, "operation_id": str(operation_id)}
-    
+        # 操作耗时较长，不在事务中执行，以免长时间持有数据库写锁；中间状态写入后立即可见
+        with _lease_heartbeat(operation_id):
+            result = _dispatch_operation(operation_type, middleware, operation.params or {})
     except Exception as e:
         logger.error(f"操作 {operation_id} ({operation_type}) 失败: {str(e)}")
         
         # 更新操作状态为失败
         try:
-            with transaction.atomic():
-                operation = MiddlewareOperation.objects.select_for_update().get(operation_id=operation_id)
-                operation.mark_failed(str(e))
+            if operation.mark_failed(str(e)):
+                operation_events.publish(operation_id, operation.status, error_message=operation.error_message)
         except Exception as inner_e:
             logger.error(f"更新操作状态失败: {str(inner_e)}")
+        return {"success": False, "error": str(e), "operation_id": operation_id}
+    
+    # 更新操作状态为已完成
+    if not operation.mark_completed(result):
+        logger.warning(f"操作 {operation_id} 的状态已被其他任务修改，未写入完成状态")
+        return {"success": False, "error": "操作状态已变化", "operation_id": operation_id}
+    operation_events.publish(operation_id, operation.status, result=operation.result)
+    
+    logger.info(f"操作 {operation_id} ({operation_type}) 成功完成")
+    return {"success": True, "operation_id": operation_id}
+
+
+# 操作结果以操作记录为准，调用方不读取任务结果，不写入结果后端
+if Batches is not None:
+    @shared_task(base=Batches, flush_every=OPERATION_BATCH_SIZE, flush_interval=OPERATION_BATCH_INTERVAL, ignore_result=True)
+    def process_middleware_operation(requests):
+        """
+        批量处理中间件操作的异步任务，调用方式与单个任务相同
         
-        return {"success": False, "error": str(e), "operation_id": str(operation_id)}
+        Args:
+            requests: 缓冲的任务请求，参数为 (operation_id, operation_type, middleware_id[, params])
+        """
+        items = [_operation_item(*request.args, **request.kwargs) for request in requests]
+        _process_operations(items, {item[0]: _delivery_queue(request) for item, request in zip(items, requests)})
+else:
+    @shared_task(bind=True, ignore_result=True)
+    def process_middleware_operation(self, operation_id, operation_type, middleware_id, params=None):
+        """
+        处理中间件操作的异步任务
+        
+        Args:
+            operation_id: 操作ID
+            operation_type: 操作类型 (start, stop, restart, upgrade, config_update)
+            middleware_id: 中间件ID
+            params: 升级前投递的消息携带的操作参数，已忽略，参数从操作记录中读取
+        """
+        item = _operation_item(operation_id, operation_type, middleware_id)
+        return _process_operations([item], {item[0]: _delivery_queue(self.request)})[0]
+
+
+def _update_middleware(middleware, now=None, **fields):
+    """只更新指定字段及最后更新时间（默认为当前时间），并同步到内存中的中间件对象"""
+    fields['last_updated'] = now or timezone.now()
+    for name, value in fields.items():
+        setattr(middleware, name, value)
+    Middleware.objects.filter(pk=middleware.pk).update(**fields)
 
 
 def start_middleware_service(middleware):
@@ -89,9 +292,7 @@ def start_middleware_service(middleware):
     # 例如，对于Redis可能是通过redis-cli或Docker命令启动服务
     
     # 更新中间件状态
-    middleware.status = 'running'
-    middleware.last_updated = timezone.now()
-    middleware.save()
+    _update_middleware(middleware, status='running')
     
     logger.info(f"中间件 {middleware.id} 已成功启动")
     return {"success": True}
@@ -113,9 +314,7 @@ def stop_middleware_service(middleware):
     # 例如，对于Redis可能是通过redis-cli或Docker命令停止服务
     
     # 更新中间件状态
-    middleware.status = 'stopped'
-    middleware.last_updated = timezone.now()
-    middleware.save()
+    _update_middleware(middleware, status='stopped')
     
     logger.info(f"中间件 {middleware.id} 已成功停止")
     return {"success": True}
@@ -130,9 +329,13 @@ def restart_middleware_service(middleware):
     """
     logger.info(f"正在重启中间件: {middleware.id} ({middleware.type})")
     
-    # 先停止再启动
-    stop_middleware_service(middleware)
-    start_middleware_service(middleware)
+    # 模拟重启过程，中间的停止状态不写入数据库
+    time.sleep(2)  # 模拟重启延迟
+    
+    # 在实际应用中，这里应该根据中间件类型执行实际的重启命令
+    
+    # 更新中间件状态
+    _update_middleware(middleware, status='running')
     
     logger.info(f"中间件 {middleware.id} 已成功重启")
     return {"success": True}
@@ -153,9 +356,7 @@ def upgrade_middleware_service(middleware, params):
     logger.info(f"正在升级中间件 {middleware.id} 到版本 {target_version}")
     
     # 更新中间件状态为更新中
-    middleware.status = 'updating'
-    middleware.last_updated = timezone.now()
-    middleware.save()
+    _update_middleware(middleware, status='updating')
     
     # 模拟备份过程
     if backup:
@@ -170,10 +371,7 @@ def upgrade_middleware_service(middleware, params):
     # 例如，对于Redis可能是通过Docker拉取新版本镜像并重启容器
     
     # 更新中间件版本和状态
-    middleware.version = target_version
-    middleware.status = 'running'
-    middleware.last_updated = timezone.now()
-    middleware.save()
+    _update_middleware(middleware, version=target_version, status='running')
     
     logger.info(f"中间件 {middleware.id} 已成功升级到版本 {target_version}")
     return {"success": True, "version": target_version}
@@ -192,21 +390,25 @@ def update_middleware_config(middleware, params):
     
     logger.info(f"正在更新中间件 {middleware.id} 的配置")
     
-    # 获取中间件配置
-    try:
-        config = middleware.config
-    except MiddlewareConfig.DoesNotExist:
-        # 如果配置不存在，创建新配置
-        config = MiddlewareConfig(middleware=middleware, config_data={})
-    
-    # 更新配置
-    config.config_data.update(new_config)
-    config.updated_at = timezone.now()
-    config.save()
-    
-    # 更新中间件最后更新时间
-    middleware.last_updated = timezone.now()
-    middleware.save()
+    # 配置与中间件最后更新时间在一个短事务中写入，共用同一个时间戳
+    now = timezone.now()
+    with transaction.atomic():
+        # 已有配置在数据库端合并，只传输变更的部分；配置已随中间件一起查询
+        config = getattr(middleware, 'config', None)
+        merge_expression = _json_merge_expression(connection.vendor, new_config)
+        merged = config is not None and merge_expression is not None and MiddlewareConfig.objects.filter(pk=config.pk).update(
+            config_data=merge_expression,
+            updated_at=now
+        )
+        if not merged:
+            # 配置不存在或数据库不支持服务端合并时，合并后一次写入，不存在则创建
+            MiddlewareConfig.objects.update_or_create(
+                middleware=middleware,
+                defaults={'config_data': {**(config.config_data if config else {}), **new_config}, 'updated_at': now}
+            )
+        
+        # 更新中间件最后更新时间
+        _update_middleware(middleware, now)
     
     logger.info(f"中间件 {middleware.id} 配置已更新")
     
@@ -218,6 +420,42 @@ def update_middleware_config(middleware, params):
     return {"success": True, "config_updated": True, "restarted": restart_after_update}
 
 
+def _compute_status_info(middleware):
+    """
+    根据已加载的中间件对象计算状态信息
+    
+    Args:
+        middleware: 中间件对象
+    """
+    # 在实际应用中，这里应该从中间件服务获取实时状态
+    # 这里仅作为示例返回模拟数据
+    if middleware.status == 'running':
+        # 模拟运行中的状态数据
+        return {
+            "uptime": 3600,  # 模拟1小时运行时间
+            "connections": 5,
+            "memory_usage": 128.5,
+            "cpu_usage": 2.3
+        }
+    else:
+        # 非运行状态
+        return {
+            "uptime": 0,
+            "connections": 0,
+            "memory_usage": 0,
+            "cpu_usage": 0
+        }
+
+
+def cached_status_info(middleware):
+    """获取状态信息，短时间内的重复请求直接使用缓存结果"""
+    return cache.get_or_set(
+        f"mw:status:{middleware.pk}:{middleware.status}",
+        lambda: _compute_status_info(middleware),
+        timeout=STATUS_CACHE_TIMEOUT
+    )
+
+
 @shared_task
 def get_middleware_status_info(middleware_id):
     """
@@ -228,25 +466,7 @@ def get_middleware_status_info(middleware_id):
     """
     try:
         middleware = Middleware.objects.get(id=middleware_id)
-        
-        # 在实际应用中，这里应该从中间件服务获取实时状态
-        # 这里仅作为示例返回模拟数据
-        if middleware.status == 'running':
-            # 模拟运行中的状态数据
-            return {
-                "uptime": 3600,  # 模拟1小时运行时间
-                "connections": 5,
-                "memory_usage": 128.5,
-                "cpu_usage": 2.3
-            }
-        else:
-            # 非运行状态
-            return {
-                "uptime": 0,
-                "connections": 0,
-                "memory_usage": 0,
-                "cpu_usage": 0
-            }
+        return cached_status_info(middleware)
     except Middleware.DoesNotExist:
         logger.error(f"中间件 {middleware_id} 不存在")
         return {
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Tuple
+
+# 最近一次格式化的 (精确到秒的时间, 格式化结果)，同一秒内的时间只需拼接微秒部分
+_last_second: Tuple[datetime, str] = (datetime.min, datetime.min.isoformat())
+
+
+def now() -> datetime:
+    """当前本地时间
+
+    结果、历史记录等对外暴露的时间戳属性为datetime对象，因此不改用time.time_ns()。
+    """
+    return datetime.now()
+
+
+def isoformat(ts: datetime) -> str:
+    """与ts.isoformat()结果相同，按秒缓存日期时间部分的格式化结果"""
+    if ts.tzinfo is not None:
+        return ts.isoformat()
+
+    global _last_second
+    second = ts.replace(microsecond=0)
+    cached_second, text = _last_second
+    if cached_second != second:
+        text = second.isoformat()
+        _last_second = (second, text)
+    if ts.microsecond:
+        return f"{text}.{ts.microsecond:06d}"
+    return text
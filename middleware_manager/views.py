@@ -2,8 +2,12 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BaseRenderer
 from django.shortcuts import get_object_or_404
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.core.cache import cache
+from django.db.models import Count, Max
 from celery import shared_task
 
 from .models import Middleware, MiddlewareConfig, MiddlewareOperation, MiddlewareStatus
@@ -13,12 +17,31 @@ from .serializers import (
     MiddlewareOperationSerializer, 
     MiddlewareStatusSerializer,
     MiddlewareUpgradeSerializer,
-    MiddlewareConfigUpdateSerializer
+    MiddlewareConfigUpdateSerializer,
+    SERIALIZER_CACHE_TIMEOUT
 )
 from .tasks import (
     process_middleware_operation,
-    get_middleware_status_info
+    cached_status_info,
+    LONG_RUNNING_QUEUE
 )
+from . import operation_events
+from .status_writer import status_writer
+
+# 同一中间件写入状态记录的最短间隔（秒），间隔内返回上一条记录
+STATUS_RECORD_INTERVAL = 30
+
+# 只需要中间件基本字段的操作类接口
+_OPERATION_ACTIONS = frozenset({'status', 'start', 'stop', 'restart', 'upgrade', 'update_config'})
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Server-Sent Events渲染器，仅用于内容协商，响应体由视图直接输出"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
 
 
 class MiddlewareViewSet(viewsets.ModelViewSet):
@@ -31,23 +54,50 @@ class MiddlewareViewSet(viewsets.ModelViewSet):
             return MiddlewareCreateSerializer
         return MiddlewareSerializer
     
+    def get_queryset(self):
+        if self.action in _OPERATION_ACTIONS:
+            # 操作类接口只读取少量字段，无需关联配置
+            return super().get_queryset().only('id', 'status', 'version', 'name')
+        return MiddlewareSerializer.setup_eager_loading(super().get_queryset())
+    
+    def list(self, request, *args, **kwargs):
+        """中间件列表，按最后更新时间和记录数缓存整页结果"""
+        params = request.query_params.urlencode()
+        state = Middleware.objects.aggregate(last_updated=Max('last_updated'), total=Count('id'))
+        last_updated = state['last_updated'].timestamp() if state['last_updated'] else 0
+        key = f"mw:list:{last_updated}:{state['total']}:{params}"
+        data = cache.get(key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(key, data, SERIALIZER_CACHE_TIMEOUT)
+        return Response(data)
+    
     @action(detail=True, methods=['get'])
     def status(self, request, pk=None):
         """获取中间件状态"""
         middleware = self.get_object()
         
-        # 获取最新状态信息
-        status_info = get_middleware_status_info(middleware.id)
+        # 间隔内且状态未变化时直接返回上一条记录
+        record_key = f"mw:status:record:{middleware.pk}:{middleware.status}"
+        data = cache.get(record_key)
+        if data is not None:
+            return Response(data)
         
-        # 创建状态记录
-        status_record = MiddlewareStatus.objects.create(
+        # 获取最新状态信息，直接使用已查询的中间件对象
+        status_info = cached_status_info(middleware)
+        
+        # 状态记录交给后台线程批量写入，直接返回未保存的记录
+        status_record = MiddlewareStatus(
             middleware=middleware,
             status=middleware.status,
+            timestamp=timezone.now(),
             **status_info
         )
+        status_writer.submit(status_record)
         
-        serializer = MiddlewareStatusSerializer(status_record)
-        return Response(serializer.data)
+        data = MiddlewareStatusSerializer(status_record).data
+        cache.set(record_key, data, STATUS_RECORD_INTERVAL)
+        return Response(data)
     
     @action(detail=True, methods=['post'])
     def start(self, request, pk=None):
@@ -151,12 +201,10 @@ class MiddlewareViewSet(viewsets.ModelViewSet):
             params=serializer.validated_data
         )
         
-        # 异步执行升级操作
-        process_middleware_operation.delay(
-            str(operation.operation_id),
-            'upgrade',
-            str(middleware.id),
-            serializer.validated_data
+        # 异步执行升级操作，长耗时任务投递到独立队列
+        process_middleware_operation.apply_async(
+            args=[str(operation.operation_id), 'upgrade', str(middleware.id)],
+            queue=LONG_RUNNING_QUEUE
         )
         
         operation_serializer = MiddlewareOperationSerializer(operation)
@@ -165,7 +213,6 @@ class MiddlewareViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def update_config(self, request, pk=None):
         """更新中间件配置"""
-        middleware = self.get_object()
         serializer = MiddlewareConfigUpdateSerializer(data=request.data)
         
         if not serializer.is_valid():
@@ -177,6 +224,8 @@ class MiddlewareViewSet(viewsets.ModelViewSet):
             # 简化处理，直接返回验证成功
             return Response({"valid": True})
         
+        middleware = self.get_object()
+        
         # 创建操作记录
         operation = MiddlewareOperation.objects.create(
             middleware=middleware,
@@ -185,12 +234,10 @@ class MiddlewareViewSet(viewsets.ModelViewSet):
             params=serializer.validated_data
         )
         
-        # 异步执行配置更新操作
-        process_middleware_operation.delay(
-            str(operation.operation_id),
-            'config_update',
-            str(middleware.id),
-            serializer.validated_data
+        # 异步执行配置更新操作，需要重启时投递到长耗时任务队列
+        process_middleware_operation.apply_async(
+            args=[str(operation.operation_id), 'config_update', str(middleware.id)],
+            queue=LONG_RUNNING_QUEUE if serializer.validated_data.get('restart_after_update', True) else None
         )
         
         operation_serializer = MiddlewareOperationSerializer(operation)
@@ -210,8 +257,26 @@ class OperationViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(operation)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'], renderer_classes=[EventStreamRenderer])
+    def events(self, request, pk=None):
+        """以Server-Sent Events推送操作状态变化，代替轮询status接口"""
+        operation = self.get_object()
+        events = operation_events.open_stream(operation)
+        if events is None:
+            # 事件流数已达上限，客户端稍后重试或退回轮询；事件流渲染器无法输出JSON，直接返回文本
+            response = HttpResponse("事件流连接数已达上限，请稍后重试", status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                    content_type='text/plain; charset=utf-8')
+            response['Retry-After'] = str(operation_events.HEARTBEAT_INTERVAL)
+            return response
+        
+        response = StreamingHttpResponse(events, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # 禁止Nginx缓冲事件流
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = self.get_serializer_class().setup_eager_loading(super().get_queryset())
         
         # 支持按中间件ID过滤
         middleware_id = self.request.query_params.get('middleware_id')